@@ -1,538 +1,486 @@
-import streamlit as st
-import pandas as pd
-import sqlite3
-from docx import Document
-from docx.shared import Pt, Inches, RGBColor
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.enum.table import WD_TABLE_ALIGNMENT
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
-import io
-import xlsxwriter
-
-# ==========================================
-# 1. DATABASE MANAGEMENT (SQLITE)
-# ==========================================
-DB_NAME = "sekolah.db"
-
-def init_db():
-    """Inisialisasi Database dan Tabel jika belum ada"""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    # Tabel Config (Info Sekolah)
-    c.execute('''CREATE TABLE IF NOT EXISTS config (key TEXT PRIMARY KEY, value TEXT)''')
-    
-    # Tabel Master
-    c.execute('''CREATE TABLE IF NOT EXISTS master_guru (nama TEXT PRIMARY KEY)''')
-    c.execute('''CREATE TABLE IF NOT EXISTS master_mapel (nama TEXT PRIMARY KEY, kkm INTEGER DEFAULT 75)''')
-    c.execute('''CREATE TABLE IF NOT EXISTS master_kelas (nama TEXT PRIMARY KEY, wali_kelas TEXT)''')
-    
-    # Tabel Siswa
-    c.execute('''CREATE TABLE IF NOT EXISTS siswa (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        nama TEXT, nisn TEXT, nipd TEXT, jk TEXT, kelas TEXT,
-        UNIQUE(nisn)
-    )''')
-    
-    # Tabel Penugasan Guru (Jadwal)
-    c.execute('''CREATE TABLE IF NOT EXISTS penugasan (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        guru TEXT, mapel TEXT, kelas TEXT,
-        UNIQUE(guru, mapel, kelas)
-    )''')
-    
-    # Tabel Nilai
-    c.execute('''CREATE TABLE IF NOT EXISTS nilai (
-        siswa_id INTEGER, mapel TEXT, nilai INTEGER,
-        PRIMARY KEY (siswa_id, mapel)
-    )''')
-    
-    # Tabel Non-Akademik (Absen & Kepribadian)
-    c.execute('''CREATE TABLE IF NOT EXISTS non_akademik (
-        siswa_id INTEGER PRIMARY KEY,
-        rapi TEXT, disiplin TEXT, jujur TEXT,
-        sakit INTEGER, izin INTEGER, alpha INTEGER
-    )''')
-    
-    # Default Info Sekolah jika kosong
-    c.execute("SELECT count(*) FROM config")
-    if c.fetchone()[0] == 0:
-        defaults = {
-            "nama_sekolah": "SMA ISLAM AL-GHOZALI",
-            "alamat": "Jl. Permata No. 19 Desa Curug",
-            "kepsek": "Antoni Firdaus M.Pd.",
-            "semester": "Genap", "tahun_ajar": "2024/2025",
-            "kota": "Gunungsindur", "tgl_raport": "20 Maret 2025"
-        }
-        for k, v in defaults.items():
-            c.execute("INSERT INTO config VALUES (?, ?)", (k, v))
-            
-    conn.commit()
-    conn.close()
-
-# --- FUNGSI CRUD HELPER ---
-def run_query(query, params=(), fetch=False):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    try:
-        c.execute(query, params)
-        if fetch:
-            data = c.fetchall()
-            return data
-        conn.commit()
-    except Exception as e:
-        st.error(f"Database Error: {e}")
-    finally:
-        conn.close()
-
-def get_config():
-    data = run_query("SELECT key, value FROM config", fetch=True)
-    return {row[0]: row[1] for row in data}
-
-def update_config(key, value):
-    run_query("INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)", (key, value))
-
-# ==========================================
-# 2. KONFIGURASI STREAMLIT
-# ==========================================
-st.set_page_config(page_title="Sistem Raport Database", layout="wide", page_icon="🏫")
-init_db() # Jalankan init DB di awal
-
-# Helper Docx
-def set_cell_bg(cell, color_hex):
-    tcPr = cell._tc.get_or_add_tcPr(); shd = OxmlElement('w:shd')
-    shd.set(qn('w:val'), 'clear'); shd.set(qn('w:color'), 'auto'); shd.set(qn('w:fill'), color_hex); tcPr.append(shd)
-
-def terbilang(n):
-    angka = ["", "Satu", "Dua", "Tiga", "Empat", "Lima", "Enam", "Tujuh", "Delapan", "Sembilan", "Sepuluh", "Sebelas"]
-    if n < 0 or n > 100: return ""
-    elif n < 12: return angka[n]
-    elif n < 20: return angka[n-10] + " Belas"
-    elif n < 100: return angka[n//10] + " Puluh " + angka[n%10]
-    elif n == 100: return "Seratus"
-    return ""
-
-if 'login_status' not in st.session_state: st.session_state['login_status'] = False
-
-# ==========================================
-# 3. WORD GENERATOR (AMBIL DARI DB)
-# ==========================================
-def generate_docx_db(siswa_id, rank, total_siswa):
-    doc = Document()
-    for section in doc.sections:
-        section.top_margin = Inches(0.5); section.bottom_margin = Inches(0.5); section.left_margin = Inches(0.5); section.right_margin = Inches(0.5)
-
-    # Ambil Data dari DB
-    conf = get_config()
-    siswa = run_query("SELECT nama, nisn, nipd, kelas FROM siswa WHERE id=?", (siswa_id,), fetch=True)[0]
-    nama_siswa, nisn, nipd, kelas = siswa
-    
-    wali_data = run_query("SELECT wali_kelas FROM master_kelas WHERE nama=?", (kelas,), fetch=True)
-    nama_wali = wali_data[0][0] if wali_data and wali_data[0][0] else "(....................)"
-    
-    non_akademik = run_query("SELECT rapi, disiplin, jujur, sakit, izin, alpha FROM non_akademik WHERE siswa_id=?", (siswa_id,), fetch=True)
-    if non_akademik: rapi, disiplin, jujur, sakit, izin, alpha = non_akademik[0]
-    else: rapi, disiplin, jujur, sakit, izin, alpha = "-", "-", "-", 0, 0, 0
-
-    # Header
-    p = doc.add_paragraph(conf['nama_sekolah']); p.alignment=1; p.runs[0].bold=True; p.runs[0].font.size=Pt(16)
-    doc.add_paragraph(f"LAPORAN HASIL BELAJAR - {conf['tahun_ajar']}").alignment=1
-    doc.add_paragraph(conf['alamat']).alignment=1
-    doc.add_paragraph("-" * 80).alignment=1
-    
-    # Identitas
-    ti = doc.add_table(3,4); ti.autofit=False; ti.columns[0].width=Inches(1.5)
-    ti.cell(0,0).text="Nama"; ti.cell(0,1).text=f": {nama_siswa}"; ti.cell(0,2).text="NIPD"; ti.cell(0,3).text=f": {nipd}"
-    ti.cell(1,0).text="Kelas"; ti.cell(1,1).text=f": {kelas}"; ti.cell(1,2).text="NISN"; ti.cell(1,3).text=f": {nisn}"
-    doc.add_paragraph()
-
-    # Nilai
-    tn = doc.add_table(2,6); tn.style='Table Grid'
-    h0=tn.rows[0].cells; h1=tn.rows[1].cells
-    h0[0].merge(h1[0]).text="NO"; h0[1].merge(h1[1]).text="Mata Pelajaran"; h0[2].merge(h1[2]).text="KKM"
-    h0[3].merge(h0[4]).text="Nilai"; h1[3].text="Angka"; h1[4].text="Huruf"; h0[5].merge(h1[5]).text="Predikat"
-    for c in h0+h1: set_cell_bg(c, "E0F7FA"); c.paragraphs[0].alignment=1; c.paragraphs[0].runs[0].bold=True
-
-    mapels = run_query("SELECT nama, kkm FROM master_mapel")
-    tot=0; cnt=0
-    for idx, (m_nama, m_kkm) in enumerate(mapels):
-        r = tn.add_row().cells
-        nilai_data = run_query("SELECT nilai FROM nilai WHERE siswa_id=? AND mapel=?", (siswa_id, m_nama), fetch=True)
-        val = nilai_data[0][0] if nilai_data else 0
-        
-        r[0].text=str(idx+1); r[1].text=m_nama; r[2].text=str(m_kkm); r[3].text=str(val); r[4].text=terbilang(val)
-        r[5].text="B" if val>=m_kkm else "C" if val>0 else "-"
-        for c in r: c.paragraphs[0].alignment=1
-        r[1].paragraphs[0].alignment=0
-        tot+=val; 
-        if val>0: cnt+=1
-
-    rs = tn.add_row().cells; rs[0].merge(rs[2]).text="Jumlah"; rs[3].text=str(tot)
-    rs[0].paragraphs[0].alignment=1; rs[3].paragraphs[0].alignment=1
-    ra = tn.add_row().cells; ra[0].merge(ra[2]).text="Rata - rata"; ra[3].text=f"{tot/cnt:.2f}" if cnt else "0"
-    ra[0].paragraphs[0].alignment=1; ra[3].paragraphs[0].alignment=1
-    doc.add_paragraph()
-
-    # Non Akademik & TTD
-    tc = doc.add_table(1,2); tc.style='Table Grid'
-    tk = tc.cell(0,0).add_table(4,2); tk.cell(0,0).text="Kepribadian"; tk.cell(1,0).text="Kerapihan"; tk.cell(1,1).text=str(rapi)
-    tk.cell(2,0).text="Kedisiplinan"; tk.cell(2,1).text=str(disiplin); tk.cell(3,0).text="Kejujuran"; tk.cell(3,1).text=str(jujur)
-    ta = tc.cell(0,1).add_table(4,2); ta.cell(0,0).text="Absensi"; ta.cell(1,0).text="Sakit"; ta.cell(1,1).text=str(sakit)
-    ta.cell(2,0).text="Izin"; ta.cell(2,1).text=str(izin); ta.cell(3,0).text="Alpha"; ta.cell(3,1).text=str(alpha)
-
-    doc.add_paragraph(f"\nPeringkat Kelas: {rank} dari {total_siswa} siswa")
-    ttd = doc.add_table(1,3); ttd.alignment=1
-    ttd.cell(0,0).text="\nOrang Tua\n\n\n(..........)"
-    ttd.cell(0,1).text=f"\nKepala Sekolah\n\n\n({conf['kepsek']})"
-    ttd.cell(0,2).text=f"\n{conf['kota']}, {conf['tgl_raport']}\nWali Kelas\n\n\n({nama_wali})"
-    for c in ttd.rows[0].cells: c.paragraphs[0].alignment=1
-
-    bio = io.BytesIO(); doc.save(bio); bio.seek(0)
-    return bio
-
-# ==========================================
-# 4. HALAMAN ADMIN (CRUD LENGKAP)
-# ==========================================
-def admin_page():
-    st.sidebar.title("Panel Admin")
-    menu = st.sidebar.radio("Menu", ["🏠 Dashboard", "👨‍🎓 Data Siswa", "⚙️ Data Master", "👨‍🏫 Penugasan & Wali", "📊 Monitoring", "⚙️ Info Sekolah"])
-    st.title("Administrator Database")
-
-    # --- CRUD SISWA ---
-    if menu == "👨‍🎓 Data Siswa":
-        t1, t2, t3 = st.tabs(["📋 Copy-Paste Excel", "Manual Input", "🗂️ Data & Hapus"])
-        
-        # 1. Copy Paste
-        with t1:
-            st.info("Format: **KELAS | Nama | NIPD | JK | NISN**")
-            raw = st.text_area("Paste Data Siswa", height=200)
-            if st.button("Simpan Data Paste"):
-                cnt=0
-                for line in raw.strip().split('\n'):
-                    p = line.split('\t') if '\t' in line else line.split(',')
-                    p = [x.strip() for x in p]
-                    if len(p)>=2:
-                        k=p[0]; n=p[1]
-                        nipd=p[2] if len(p)>2 else "-"; jk=p[3] if len(p)>3 else "-"; nisn=p[4] if len(p)>4 else "-"
-                        if k.upper() != "KELAS":
-                            # Auto add kelas if not exist
-                            run_query("INSERT OR IGNORE INTO master_kelas (nama) VALUES (?)", (k,))
-                            run_query("INSERT OR REPLACE INTO siswa (nama, nisn, nipd, jk, kelas) VALUES (?,?,?,?,?)", (n, nisn, nipd, jk, k))
-                            cnt+=1
-                st.success(f"{cnt} Siswa berhasil disimpan ke Database!")
-
-        # 2. Manual
-        with t2:
-            with st.form("add_s"):
-                c1,c2=st.columns(2)
-                nm=c1.text_input("Nama"); ni=c2.text_input("NISN")
-                np=c1.text_input("NIPD"); jk=c2.selectbox("JK",["L","P"])
-                kls_list = [r[0] for r in run_query("SELECT nama FROM master_kelas", fetch=True)]
-                k=st.selectbox("Kelas", kls_list if kls_list else ["Belum Ada Kelas"])
-                if st.form_submit_button("Tambah Siswa"):
-                    run_query("INSERT INTO siswa (nama, nisn, nipd, jk, kelas) VALUES (?,?,?,?,?)", (nm, ni, np, jk, k))
-                    st.success("Siswa ditambahkan")
-
-        # 3. View & Delete
-        with t3:
-            df = pd.read_sql("SELECT * FROM siswa", sqlite3.connect(DB_NAME))
-            st.dataframe(df)
-            
-            # Delete feature
-            del_id = st.number_input("Masukkan ID Siswa untuk dihapus", min_value=0)
-            if st.button("Hapus Siswa"):
-                run_query("DELETE FROM siswa WHERE id=?", (del_id,))
-                run_query("DELETE FROM nilai WHERE siswa_id=?", (del_id,)) # Hapus nilainya juga
-                st.success(f"Siswa ID {del_id} terhapus.")
-                st.rerun()
-
-    # --- DATA MASTER ---
-    elif menu == "⚙️ Data Master":
-        c1, c2, c3 = st.columns(3)
-        with c1:
-            st.write("#### Guru")
-            raw_g = st.text_area("Paste Guru (Baris baru)", height=150)
-            if st.button("Update Guru"):
-                for l in raw_g.split('\n'):
-                    if l.strip(): run_query("INSERT OR IGNORE INTO master_guru (nama) VALUES (?)", (l.strip(),))
-                st.success("Tersimpan")
-            # Show list
-            st.write([r[0] for r in run_query("SELECT nama FROM master_guru", fetch=True)])
-
-        with c2:
-            st.write("#### Mapel & KKM")
-            raw_m = st.text_area("Paste Mapel", height=150)
-            kkm_def = st.number_input("KKM Default", 60, 100, 75)
-            if st.button("Update Mapel"):
-                for l in raw_m.split('\n'):
-                    if l.strip(): run_query("INSERT OR IGNORE INTO master_mapel (nama, kkm) VALUES (?,?)", (l.strip(), kkm_def))
-                st.success("Tersimpan")
-            # Show list
-            st.write(pd.read_sql("SELECT * FROM master_mapel", sqlite3.connect(DB_NAME)))
-
-        with c3:
-            st.write("#### Kelas")
-            raw_k = st.text_area("Paste Kelas", height=150)
-            if st.button("Update Kelas"):
-                for l in raw_k.split('\n'):
-                    if l.strip(): run_query("INSERT OR IGNORE INTO master_kelas (nama) VALUES (?)", (l.strip(),))
-                st.success("Tersimpan")
-            st.write([r[0] for r in run_query("SELECT nama FROM master_kelas", fetch=True)])
-
-    # --- PENUGASAN & WALI ---
-    elif menu == "👨‍🏫 Penugasan & Wali":
-        t1, t2 = st.tabs(["Wali Kelas", "Penugasan Mapel"])
-        
-        with t1:
-            kls = [r[0] for r in run_query("SELECT nama FROM master_kelas", fetch=True)]
-            gru = [r[0] for r in run_query("SELECT nama FROM master_guru", fetch=True)]
-            
-            c1, c2 = st.columns(2)
-            k_sel = c1.selectbox("Pilih Kelas", kls)
-            g_sel = c2.selectbox("Pilih Wali", gru)
-            if st.button("Set Wali Kelas"):
-                run_query("UPDATE master_kelas SET wali_kelas=? WHERE nama=?", (g_sel, k_sel))
-                st.success(f"Wali kelas {k_sel} diset ke {g_sel}")
-            
-            st.write("Daftar Wali Kelas:")
-            st.dataframe(pd.read_sql("SELECT nama as Kelas, wali_kelas FROM master_kelas", sqlite3.connect(DB_NAME)))
-
-        with t2:
-            mpl = [r[0] for r in run_query("SELECT nama FROM master_mapel", fetch=True)]
-            
-            with st.form("assign"):
-                g = st.selectbox("Guru", gru)
-                m = st.selectbox("Mapel", mpl)
-                ks = st.multiselect("Kelas Ajar", kls)
-                if st.form_submit_button("Simpan Penugasan"):
-                    for k in ks:
-                        run_query("INSERT OR REPLACE INTO penugasan (guru, mapel, kelas) VALUES (?,?,?)", (g, m, k))
-                    st.success("Penugasan tersimpan")
-            
-            st.write("Tabel Penugasan:")
-            st.dataframe(pd.read_sql("SELECT * FROM penugasan", sqlite3.connect(DB_NAME)))
-            
-            del_id = st.number_input("ID Penugasan Hapus", 0)
-            if st.button("Hapus Penugasan"):
-                run_query("DELETE FROM penugasan WHERE id=?", (del_id,))
-                st.success("Terhapus"); st.rerun()
-
-    # --- MONITORING ---
-    elif menu == "📊 Monitoring":
-        st.subheader("Monitoring Input Nilai")
-        # Logic Matrix
-        mapels = [r[0] for r in run_query("SELECT nama FROM master_mapel", fetch=True)]
-        kelas_list = [r[0] for r in run_query("SELECT nama FROM master_kelas", fetch=True)]
-        
-        data = []
-        for m in mapels:
-            row = {"Mapel": m}
-            for k in kelas_list:
-                # Cek Penugasan
-                tugas = run_query("SELECT guru FROM penugasan WHERE mapel=? AND kelas=?", (m, k), fetch=True)
-                guru_nama = tugas[0][0] if tugas else ""
-                
-                # Cek Nilai (Minimal 1 siswa)
-                if guru_nama:
-                    siswa_ids = run_query("SELECT id FROM siswa WHERE kelas=?", (k,), fetch=True)
-                    has_nilai = False
-                    if siswa_ids:
-                        chk = run_query("SELECT count(*) FROM nilai WHERE mapel=? AND siswa_id=?", (m, siswa_ids[0][0]), fetch=True)
-                        if chk[0][0] > 0: has_nilai = True
-                    
-                    status = f"✅ {guru_nama}" if has_nilai else f"❌ {guru_nama}"
-                else:
-                    status = "⚠️ Kosong"
-                row[k] = status
-            data.append(row)
-        st.dataframe(pd.DataFrame(data), use_container_width=True)
-
-    elif menu == "⚙️ Info Sekolah":
-        conf = get_config()
-        with st.form("sch"):
-            n=st.text_input("Nama",conf['nama_sekolah']); a=st.text_input("Alamat",conf['alamat'])
-            k=st.text_input("Kepsek",conf['kepsek'])
-            c1,c2=st.columns(2); ci=c1.text_input("Kota",conf['kota']); tg=c2.text_input("Tgl",conf['tgl_raport'])
-            if st.form_submit_button("Simpan"):
-                update_config("nama_sekolah", n); update_config("alamat", a)
-                update_config("kepsek", k); update_config("kota", ci); update_config("tgl_raport", tg)
-                st.success("Tersimpan")
-
-    elif menu == "🏠 Dashboard":
-        jml_siswa = run_query("SELECT count(*) FROM siswa", fetch=True)[0][0]
-        st.metric("Total Siswa", jml_siswa)
-
-# ==========================================
-# 5. HALAMAN GURU
-# ==========================================
-def guru_page():
-    guru = st.session_state['active_user']
-    
-    # Ambil mapel & kelas yg ditugaskan ke guru ini
-    tugas = run_query("SELECT mapel, kelas FROM penugasan WHERE guru=?", (guru,), fetch=True)
-    if not tugas: st.warning("Anda belum memiliki penugasan jadwal."); return
-    
-    # Selectbox filter
-    list_mapel = list(set([t[0] for t in tugas]))
-    p_mapel = st.selectbox("Pilih Mapel", list_mapel)
-    
-    list_kelas = [t[1] for t in tugas if t[0] == p_mapel]
-    p_kelas = st.selectbox("Pilih Kelas", list_kelas)
-    
-    st.title(f"Input Nilai: {p_mapel} - {p_kelas}")
-    
-    # Ambil KKM
-    kkm_data = run_query("SELECT kkm FROM master_mapel WHERE nama=?", (p_mapel,), fetch=True)
-    kkm = kkm_data[0][0] if kkm_data else 75
-    st.info(f"KKM: {kkm}")
-    
-    # Ambil Siswa
-    siswa = run_query("SELECT id, nama FROM siswa WHERE kelas=? ORDER BY nama", (p_kelas,), fetch=True)
-    
-    t1, t2, t3 = st.tabs(["Manual", "Upload", "Copy-Paste"])
-    
-    with t1:
-        with st.form("input_manual"):
-            input_vals = {}
-            for sid, snama in siswa:
-                # Get current val
-                cur = run_query("SELECT nilai FROM nilai WHERE siswa_id=? AND mapel=?", (sid, p_mapel), fetch=True)
-                val = cur[0][0] if cur else 0
-                input_vals[sid] = st.number_input(f"{snama}", 0, 100, val)
-            
-            if st.form_submit_button("Simpan"):
-                for sid, v in input_vals.items():
-                    run_query("INSERT OR REPLACE INTO nilai (siswa_id, mapel, nilai) VALUES (?,?,?)", (sid, p_mapel, v))
-                st.success("Tersimpan ke Database!")
-
-    with t3:
-        st.info("Copy kolom **Nama** dan **Nilai** dari Excel")
-        raw = st.text_area("Paste", height=200)
-        if st.button("Proses Paste"):
-            cnt=0
-            for line in raw.split('\n'):
-                p = line.split('\t') if '\t' in line else line.split(',')
-                if len(p)>=2:
-                    nm=p[0].strip()
-                    try: val=int(float(p[1].strip()))
-                    except: val=0
-                    # Cari ID siswa by nama (fuzzy/exact match logic sederhana)
-                    # Di sini pakai exact match lowercase
-                    found_sid = next((s[0] for s in siswa if s[1].lower() == nm.lower()), None)
-                    if found_sid:
-                        run_query("INSERT OR REPLACE INTO nilai (siswa_id, mapel, nilai) VALUES (?,?,?)", (found_sid, p_mapel, val))
-                        cnt+=1
-            st.success(f"{cnt} nilai tersimpan")
-
-# ==========================================
-# 6. HALAMAN WALI KELAS
-# ==========================================
-def wali_page():
-    wali = st.session_state['active_user']
-    # Cari kelas binaan
-    kelas_data = run_query("SELECT nama FROM master_kelas WHERE wali_kelas=?", (wali,), fetch=True)
-    if not kelas_data: st.warning("Anda tidak terdaftar sebagai Wali Kelas."); return
-    
-    kelas = st.selectbox("Pilih Kelas Binaan", [k[0] for k in kelas_data])
-    
-    siswa = run_query("SELECT id, nama, nisn FROM siswa WHERE kelas=? ORDER BY nama", (kelas,), fetch=True)
-    mapels = [r[0] for r in run_query("SELECT nama FROM master_mapel", fetch=True)]
-    
-    # Hitung Ranking Logic
-    rank_data = []
-    for sid, _, _ in siswa:
-        total = run_query("SELECT sum(nilai) FROM nilai WHERE siswa_id=?", (sid,), fetch=True)[0][0]
-        rank_data.append({"id": sid, "total": total if total else 0})
-    rank_data.sort(key=lambda x: x['total'], reverse=True)
-    rank_map = {x['id']: i+1 for i, x in enumerate(rank_data)}
-    
-    t1, t2, t3 = st.tabs(["Non-Akademik", "Leger", "Raport"])
-    
-    with t1:
-        with st.form("non"):
-            vals = {}
-            for sid, snama, _ in siswa:
-                cur = run_query("SELECT * FROM non_akademik WHERE siswa_id=?", (sid,), fetch=True)
-                if cur: _, rapi, disp, jujur, s, i, a = cur[0]
-                else: rapi, disp, jujur, s, i, a = "-","-","-",0,0,0
-                
-                with st.expander(snama):
-                    c1,c2=st.columns(2)
-                    with c1:
-                        kr=st.selectbox(f"Rapi {sid}", ["-","AA","BB"], index=["-","AA","BB"].index(rapi) if rapi in ["-","AA","BB"] else 0)
-                        kd=st.selectbox(f"Disp {sid}", ["-","AA","BB"], index=["-","AA","BB"].index(disp) if disp in ["-","AA","BB"] else 0)
-                        kj=st.selectbox(f"Jujur {sid}", ["-","AA","BB"], index=["-","AA","BB"].index(jujur) if jujur in ["-","AA","BB"] else 0)
-                    with c2:
-                        sa=st.number_input(f"Sakit {sid}",0,100,s)
-                        iz=st.number_input(f"Izin {sid}",0,100,i)
-                        al=st.number_input(f"Alpa {sid}",0,100,a)
-                    vals[sid] = (kr, kd, kj, sa, iz, al)
-            if st.form_submit_button("Simpan"):
-                for sid, d in vals.items():
-                    run_query("INSERT OR REPLACE INTO non_akademik VALUES (?,?,?,?,?,?,?)", (sid, *d))
-                st.success("Tersimpan")
-
-    with t2:
-        rows = []
-        shorts = {m: m[:4].upper() for m in mapels}
-        for idx, (sid, snama, _) in enumerate(siswa):
-            r = {"No": idx+1, "Nama": snama}
-            tot = 0; cnt = 0
-            for m in mapels:
-                val = run_query("SELECT nilai FROM nilai WHERE siswa_id=? AND mapel=?", (sid, m), fetch=True)
-                v = val[0][0] if val else 0
-                r[shorts[m]] = v; tot += v; 
-                if v>0: cnt+=1
-            r["Total"] = tot; r["Rata"] = f"{tot/cnt:.2f}" if cnt else "0"
-            r["Rank"] = rank_map.get(sid)
-            rows.append(r)
-        
-        df = pd.DataFrame(rows)
-        st.dataframe(df)
-        
-        buf = io.BytesIO()
-        with pd.ExcelWriter(buf) as w: df.to_excel(w, index=False)
-        st.download_button("Download Excel", buf, "Leger.xlsx")
-
-    with t3:
-        for sid, snama, _ in siswa:
-            c1,c2 = st.columns([4,1])
-            c1.write(f"{snama} (Rank {rank_map.get(sid)})")
-            docx = generate_docx_db(sid, rank_map.get(sid), len(siswa))
-            c2.download_button("Unduh", docx, f"Raport_{snama}.docx", key=f"dl_{sid}")
-
-# ==========================================
-# 7. LOGIN SCREEN
-# ==========================================
-def login_screen():
-    st.markdown("<h1 style='text-align:center'>SISTEM RAPORT DATABASE</h1>", unsafe_allow_html=True)
-    t1,t2,t3 = st.tabs(["ADMIN", "WALI KELAS", "GURU"])
-    
-    with t1:
-        if st.button("Masuk Admin") and st.text_input("Password", type="password") == "admin":
-            st.session_state['login_status'] = True; st.session_state['user_role'] = 'admin'; st.rerun()
-            
-    with t2:
-        walis = [r[0] for r in run_query("SELECT DISTINCT wali_kelas FROM master_kelas WHERE wali_kelas IS NOT NULL", fetch=True)]
-        w = st.selectbox("Nama Wali", walis)
-        if st.button("Masuk Wali"):
-            st.session_state['login_status']=True; st.session_state['user_role']='wali'; st.session_state['active_user']=w; st.rerun()
-            
-    with t3:
-        gurus = [r[0] for r in run_query("SELECT nama FROM master_guru", fetch=True)]
-        g = st.selectbox("Nama Guru", gurus)
-        if st.button("Masuk Guru"):
-            st.session_state['login_status']=True; st.session_state['user_role']='guru'; st.session_state['active_user']=g; st.rerun()
-
-if not st.session_state['login_status']:
-    login_screen()
-else:
-    with st.sidebar:
-        if st.button("Keluar"): 
-            st.session_state['login_status'] = False; st.rerun()
-    
-    role = st.session_state['user_role']
-    if role == 'admin': admin_page()
-    elif role == 'guru': guru_page()
-    elif role == 'wali': wali_page()
\ No newline at end of file
+import os
+from contextlib import contextmanager
+
+import streamlit as st
+
+import raport_cache
+import raport_db
+import raport_metrik as metrik
+from raport_db import (init_db, run_query, run_many, read_sql, write, get_config, update_config,
+                       load_kelas_snapshot, refresh_peringkat, refresh_semua, kelas_siswa, list_guru, list_mapel, list_kelas)
+from raport_docx import generate_docx_db, generate_zip_kelas
+from raport_leger import load_leger, tabel_leger, export_leger_xlsx
+from raport_stats import (load_monitoring, matriks_monitoring, load_rekap, load_rekap_absen, load_kkm_siswa, ringkas_rekap,
+                          sebaran_nilai, ringkas_absen)
+from raport_arsip import (daftar_term, daftar_arsip, ganti_term, arsipkan_term, kelas_arsip,
+                          load_kelas_snapshot_arsip)
+from raport_batch import buat_job, batalkan_job, daftar_job, progres_job, mulai_runner, ada_job_tertunda, ada_job_aktif
+from raport_import import (parse_siswa, parse_guru, parse_mapel, parse_kelas, parse_nilai, parse_nilai_file,
+                           siswa_kelas, apply_import, ringkasan, PILIHAN_SIKAP,
+                           grid_nilai, simpan_grid_nilai, grid_non_akademik, simpan_grid_non_akademik)
+
+# ==========================================
+# 1. KONFIGURASI STREAMLIT
+# ==========================================
+st.set_page_config(page_title="Sistem Raport Database", layout="wide", page_icon="🏫")
+raport_db.on_error = st.error
+
+if 'login_status' not in st.session_state: st.session_state['login_status'] = False
+
+@st.cache_resource(show_spinner=False)
+def siapkan_db(db_name):
+    """init_db() (CREATE TABLE + migrasi) cukup sekali per proses server
+    per file DB, bukan di setiap rerun"""
+    init_db()
+
+@contextmanager
+def tab(t, nama):
+    """st.tabs + ukur waktu tab (raport_metrik, jika aktif)"""
+    with t, metrik.bagian(nama): yield
+
+def simpan(fn, *args, langsung=False):
+    """Tulis lewat writer thread (raport_db.write); langsung=True untuk fungsi yang
+    sudah memakai write() sendiri (apply_import, simpan_grid_*, ganti_term, ...).
+    Mengembalikan hasil fn (True jika fn tidak mengembalikan apa-apa) hanya setelah
+    COMMIT; None jika gagal (pesan error) atau belum dikonfirmasi (timeout)."""
+    try: hasil = fn(*args) if langsung else write(fn, *args)
+    except TimeoutError:
+        st.warning("Penyimpanan belum dikonfirmasi: masih antre di database dan mungkin tetap tersimpan. "
+                   "Muat ulang halaman sebentar lagi untuk memeriksa."); return None
+    except Exception as e: st.error(f"Gagal menyimpan, data TIDAK tersimpan: {e}"); return None
+    return True if hasil is None else hasil
+
+def panel_import(key, buat_rencana, label="Proses Paste"):
+    """Alur import massal: parse & validasi -> pratinjau per baris -> simpan sekali (1 transaksi)"""
+    if st.button(label, key=f"cek_{key}"):
+        st.session_state[key] = buat_rencana()
+    plan = st.session_state.get(key)
+    if not plan: return
+    import pandas as pd
+
+    rk = ringkasan(plan)
+    st.write(" · ".join(f"**{v}** {k}" for k, v in rk.items()) or "Tidak ada data")
+    st.dataframe(pd.DataFrame(plan["laporan"]), hide_index=True)
+    n_mirip = sum(1 for r in plan["laporan"] if r.get("Cocok") and r["Status"] in ("baru", "ubah"))
+    if n_mirip: st.warning(f"{n_mirip} baris dicocokkan tidak persis (kolom **Cocok**): periksa sebelum menyimpan.")
+    n_tulis = rk.get("baru", 0) + rk.get("ubah", 0)
+    if st.button(f"💾 Simpan {n_tulis} baris", key=f"simpan_{key}", disabled=not plan["ops"]):
+        if simpan(apply_import, plan, langsung=True) is None: return
+        del st.session_state[key]
+        st.success(f"{n_tulis} baris tersimpan ke Database! ({rk.get('ditolak', 0)} ditolak)")
+
+# ==========================================
+# 2. HALAMAN ADMIN (CRUD LENGKAP)
+# ==========================================
+def admin_page():
+    import pandas as pd # dimuat saat halaman admin dibuka, bukan di layar login
+    st.sidebar.title("Panel Admin")
+    menu = st.sidebar.radio("Menu", ["🏠 Dashboard", "👨‍🎓 Data Siswa", "⚙️ Data Master", "👨‍🏫 Penugasan & Wali", "📊 Monitoring", "⚙️ Info Sekolah", "📅 Term & Arsip", "🖨️ Cetak Massal", "🔬 Instrumentasi"])
+    metrik.tandai_halaman(f"admin {menu}")
+    st.title("Administrator Database")
+
+    # --- CRUD SISWA ---
+    if menu == "👨‍🎓 Data Siswa":
+        t1, t2, t3 = st.tabs(["📋 Copy-Paste Excel", "Manual Input", "🗂️ Data & Hapus"])
+        
+        # 1. Copy Paste
+        with tab(t1, "Paste"):
+            st.info("Format: **KELAS | Nama | NIPD | JK | NISN**")
+            raw = st.text_area("Paste Data Siswa", height=200)
+            tambah_kelas = st.checkbox("Tambahkan kelas baru otomatis", True)
+            panel_import("imp_siswa", lambda: parse_siswa(raw, tambah_kelas), "Cek Data Paste")
+
+        # 2. Manual
+        with tab(t2, "Manual"):
+            with st.form("add_s"):
+                c1,c2=st.columns(2)
+                nm=c1.text_input("Nama"); ni=c2.text_input("NISN")
+                np=c1.text_input("NIPD"); jk=c2.selectbox("JK",["L","P"])
+                kls_list = [k for k, _ in list_kelas()]
+                k=st.selectbox("Kelas", kls_list if kls_list else ["Belum Ada Kelas"])
+                if st.form_submit_button("Tambah Siswa"):
+                    def tambah():
+                        run_query("INSERT INTO siswa (nama, nisn, nipd, jk, kelas) VALUES (?,?,?,?,?)", (nm, ni, np, jk, k))
+                        refresh_peringkat([k])
+                    if simpan(tambah) is not None: st.success("Siswa ditambahkan")
+
+        # 3. View & Delete
+        with tab(t3, "Data & Hapus"):
+            df = read_sql("SELECT * FROM siswa")
+            st.dataframe(df)
+            
+            # Delete feature
+            del_id = st.number_input("Masukkan ID Siswa untuk dihapus", min_value=0)
+            if st.button("Hapus Siswa"):
+                def hapus():
+                    kls_hapus = kelas_siswa([del_id])
+                    run_query("DELETE FROM siswa WHERE id=?", (del_id,)) # nilai & non-akademik ikut terhapus (CASCADE)
+                    refresh_peringkat(kls_hapus)
+                if simpan(hapus) is not None:
+                    st.success(f"Siswa ID {del_id} terhapus.")
+                    st.rerun()
+
+    # --- DATA MASTER ---
+    elif menu == "⚙️ Data Master":
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            st.write("#### Guru")
+            raw_g = st.text_area("Paste Guru (Baris baru)", height=150)
+            panel_import("imp_guru", lambda: parse_guru(raw_g), "Update Guru")
+            # Show list
+            st.write(list(list_guru()))
+
+        with c2:
+            st.write("#### Mapel & KKM")
+            raw_m = st.text_area("Paste Mapel (opsional kolom ke-2: KKM)", height=150)
+            kkm_def = st.number_input("KKM Default", 60, 100, 75)
+            panel_import("imp_mapel", lambda: parse_mapel(raw_m, kkm_def), "Update Mapel")
+            # Show list
+            st.write(pd.DataFrame(list_mapel(), columns=["nama", "kkm"]))
+
+        with c3:
+            st.write("#### Kelas")
+            raw_k = st.text_area("Paste Kelas", height=150)
+            panel_import("imp_kelas", lambda: parse_kelas(raw_k), "Update Kelas")
+            st.write([k for k, _ in list_kelas()])
+
+    # --- PENUGASAN & WALI ---
+    elif menu == "👨‍🏫 Penugasan & Wali":
+        t1, t2 = st.tabs(["Wali Kelas", "Penugasan Mapel"])
+        
+        with tab(t1, "Wali Kelas"):
+            kls = [k for k, _ in list_kelas()]
+            gru = list(list_guru())
+            
+            c1, c2 = st.columns(2)
+            k_sel = c1.selectbox("Pilih Kelas", kls)
+            g_sel = c2.selectbox("Pilih Wali", gru)
+            if st.button("Set Wali Kelas") and simpan(
+                    run_query, "UPDATE master_kelas SET wali_kelas=? WHERE nama=?", (g_sel, k_sel)) is not None:
+                st.success(f"Wali kelas {k_sel} diset ke {g_sel}")
+            
+            st.write("Daftar Wali Kelas:")
+            st.dataframe(pd.DataFrame(list_kelas(), columns=["Kelas", "wali_kelas"]))
+
+        with tab(t2, "Penugasan"):
+            mpl = [m for m, _ in list_mapel()]
+            
+            with st.form("assign"):
+                g = st.selectbox("Guru", gru)
+                m = st.selectbox("Mapel", mpl)
+                ks = st.multiselect("Kelas Ajar", kls)
+                if st.form_submit_button("Simpan Penugasan") and simpan(
+                        run_many, "INSERT OR REPLACE INTO penugasan (guru, mapel, kelas) VALUES (?,?,?)", [(g, m, k) for k in ks]) is not None:
+                    st.success("Penugasan tersimpan")
+            
+            st.write("Tabel Penugasan:")
+            st.dataframe(read_sql("SELECT * FROM penugasan"))
+            
+            del_id = st.number_input("ID Penugasan Hapus", 0)
+            if st.button("Hapus Penugasan") and simpan(run_query, "DELETE FROM penugasan WHERE id=?", (del_id,)) is not None:
+                st.success("Terhapus"); st.rerun()
+
+    # --- MONITORING ---
+    elif menu == "📊 Monitoring":
+        st.subheader("Monitoring Input Nilai")
+        # Satu query agregat: penugasan + jumlah nilai terisi per (mapel, kelas)
+        persen = st.toggle("Tampilkan persentase")
+        st.dataframe(matriks_monitoring(load_monitoring(), persen), use_container_width=True)
+
+        st.write("#### Leger Seluruh Sekolah")
+        st.download_button("Download Leger (1 sheet per kelas)", export_leger_xlsx, "Leger_Sekolah.xlsx", on_click="ignore")
+
+    elif menu == "⚙️ Info Sekolah":
+        conf = get_config()
+        with st.form("sch"):
+            n=st.text_input("Nama",conf['nama_sekolah']); a=st.text_input("Alamat",conf['alamat'])
+            k=st.text_input("Kepsek",conf['kepsek'])
+            c1,c2=st.columns(2); ci=c1.text_input("Kota",conf['kota']); tg=c2.text_input("Tgl",conf['tgl_raport'])
+            if st.form_submit_button("Simpan"):
+                def simpan_info():
+                    update_config("nama_sekolah", n); update_config("alamat", a)
+                    update_config("kepsek", k); update_config("kota", ci); update_config("tgl_raport", tg)
+                if simpan(simpan_info) is not None: st.success("Tersimpan")
+
+    elif menu == "📅 Term & Arsip":
+        conf = get_config()
+        st.subheader(f"Term Aktif: {conf.get('tahun_ajar')} - {conf.get('semester')}")
+        st.caption("Input nilai, leger, monitoring dan raport selalu memakai term aktif.")
+        with st.form("term"):
+            c1, c2 = st.columns(2)
+            ta = c1.text_input("Tahun Ajar", conf.get('tahun_ajar', ''))
+            sem = c2.selectbox("Semester", ["Ganjil", "Genap"], index=1 if conf.get('semester') == "Genap" else 0)
+            if st.form_submit_button("Jadikan Term Aktif"):
+                if simpan(ganti_term, ta, sem, langsung=True) is not None:
+                    st.success(f"Term aktif sekarang {ta} - {sem}"); st.rerun()
+
+        st.write("#### Term di Database Utama")
+        terms = daftar_term()
+        st.dataframe(pd.DataFrame(terms, columns=["Tahun Ajar", "Semester", "Jumlah Nilai"]), hide_index=True)
+        lama = [(t, s) for t, s, _ in terms if (t, s) != (conf.get('tahun_ajar'), conf.get('semester'))]
+        if lama:
+            pilih = st.selectbox("Term yang ditutup", lama, format_func=lambda x: f"{x[0]} - {x[1]}")
+            if st.button("🗄️ Arsipkan Term") and (hasil := simpan(arsipkan_term, *pilih, langsung=True)) is not None:
+                path, n_nilai, n_non = hasil
+                st.success(f"{n_nilai} nilai & {n_non} data non-akademik dipindah ke {path}"); st.rerun()
+
+        st.write("#### Arsip")
+        arsip = daftar_arsip()
+        if not arsip: st.info("Belum ada term yang diarsipkan.")
+        else:
+            st.dataframe(pd.DataFrame(arsip, columns=["Tahun Ajar", "Semester", "File", "Diarsipkan"]), hide_index=True)
+            c1, c2 = st.columns(2)
+            term = c1.selectbox("Arsip", [(t, s) for t, s, *_ in arsip], format_func=lambda x: f"{x[0]} - {x[1]}")
+            k = c2.selectbox("Kelas", kelas_arsip(*term))
+            if k and st.button("📦 Buat Ulang Raport Kelas (ZIP)"):
+                snap = load_kelas_snapshot_arsip(k, *term)
+                st.session_state['zip_arsip'] = (f"Raport_{k}_{term[0]}_{term[1]}.zip".replace("/", "-"),
+                                                 generate_zip_kelas(snap).getvalue())
+            if 'zip_arsip' in st.session_state:
+                nama, data = st.session_state['zip_arsip']
+                st.download_button(f"⬇️ Unduh {nama}", data, nama, mime="application/zip")
+
+    elif menu == "🖨️ Cetak Massal":
+        st.subheader("Cetak Raport Seluruh Sekolah")
+        st.caption("Dikerjakan di latar belakang (boleh pindah halaman). Job yang terputus karena server mati dilanjutkan otomatis.")
+        if ada_job_tertunda(): mulai_runner()
+        semua = [k for k, _ in list_kelas()]
+        pilih = st.multiselect("Kelas (kosong = semua kelas)", semua)
+        if st.button("🖨️ Mulai Cetak", disabled=not semua):
+            st.session_state['batch_job'] = buat_job(pilih or semua)
+        st.fragment(progres_batch, run_every=2 if ada_job_aktif() else None)()
+
+    elif menu == "🔬 Instrumentasi":
+        st.subheader("Instrumentasi Query & Render")
+        metrik.aktifkan(st.toggle("Aktifkan pencatatan (semua sesi)", metrik.AKTIF))
+        if st.button("Reset Data"): metrik.reset()
+        c = raport_cache.statistik
+        st.caption(f"Cache dokumen raport (proses ini): {c['hit']} hit · {c['miss']} miss · {c['buang']} dibuang (LRU) · {c['gagal']} gagal ditulis")
+        df = metrik.daftar_rerun()
+        st.caption(f"{len(df)} rerun terakhir (maks {metrik.MAKS_RERUN})")
+        if not df.empty:
+            st.write("#### Per Halaman")
+            st.dataframe(metrik.persentil_halaman(df), use_container_width=True)
+            st.write("#### Per Tab")
+            st.dataframe(metrik.persentil_bagian(df), hide_index=True, use_container_width=True)
+            st.write("#### Rerun Terlambat")
+            st.dataframe(metrik.rerun_terlambat(df), hide_index=True, use_container_width=True)
+            st.write("#### Statement SQL Terberat (total waktu)")
+            st.dataframe(metrik.statement_terburuk(), hide_index=True, use_container_width=True)
+
+    elif menu == "🏠 Dashboard":
+        # Semua angka dari tabel rekap (diperbarui saat nilai ditulis), bukan dari tabel nilai
+        jml_siswa = run_query("SELECT count(*) FROM siswa", fetch=True)[0][0]
+        rekap, absen, kkm_siswa = load_rekap(), load_rekap_absen(), load_kkm_siswa()
+        conf = get_config()
+        st.caption(f"Term aktif: {conf.get('tahun_ajar')} {conf.get('semester')}")
+        c = st.columns(5)
+        c[0].metric("Total Siswa", jml_siswa)
+        if rekap.empty:
+            st.info("Belum ada rekap nilai (data mapel/siswa masih kosong).")
+        else:
+            sek = ringkas_rekap(rekap, kkm_siswa=kkm_siswa).iloc[0]
+            c[1].metric("Rata-rata Sekolah", f"{sek['Rata']:.2f}" if sek["Terisi"] else "-")
+            c[2].metric("Siswa di Bawah KKM", f"{sek['Siswa < KKM %']:.1f}%" if sek["Terisi"] else "-",
+                        help="Siswa yang punya minimal satu nilai di bawah KKM, dari siswa yang sudah bernilai")
+            c[3].metric("Kelengkapan Nilai", f"{sek['Kelengkapan %']:.1f}%")
+        c[4].metric("Sakit / Izin / Alpha", " / ".join(str(int(absen[k].sum())) for k in ("sakit", "izin", "alpha")))
+
+        if not rekap.empty:
+            t1, t2, t3, t4 = st.tabs(["Per Kelas", "Per Mapel", "Sebaran Nilai", "Absensi"])
+            kolom_persen = {k: st.column_config.ProgressColumn(k, format="%.1f%%", min_value=0, max_value=100)
+                            for k in ("Kelengkapan %", "Siswa < KKM %")}
+            with tab(t1, "Per Kelas"):
+                st.dataframe(ringkas_rekap(rekap, "kelas", kkm_siswa), column_config=kolom_persen, use_container_width=True)
+            with tab(t2, "Per Mapel"):
+                st.dataframe(ringkas_rekap(rekap, "mapel"), column_config=kolom_persen, use_container_width=True)
+            with tab(t3, "Sebaran"):
+                mapel = st.selectbox("Mapel", ["Semua Mapel"] + sorted(rekap["mapel"].unique()), key="dash_mapel")
+                data = rekap if mapel == "Semua Mapel" else rekap[rekap["mapel"] == mapel]
+                st.bar_chart(sebaran_nilai(data).T.rename(columns={"Sekolah": "Jumlah nilai"}))
+                st.dataframe(sebaran_nilai(data, "kelas"), use_container_width=True)
+            with tab(t4, "Absensi"):
+                st.dataframe(ringkas_absen(absen), use_container_width=True)
+
+        if st.button("🔄 Hitung Ulang Rekap & Peringkat", help="Biasanya tidak perlu: rekap diperbarui setiap nilai disimpan"):
+            if simpan(refresh_semua) is not None: st.rerun()
+
+def progres_batch():
+    """Progres per kelas job cetak massal (diperbarui berkala selama ada job berjalan)"""
+    jobs = daftar_job()
+    if jobs.empty: st.info("Belum ada job cetak."); return
+    ids = list(jobs["id"]); pilih = st.session_state.get('batch_job')
+    jid = st.selectbox("Job", ids, index=ids.index(pilih) if pilih in ids else 0,
+                       format_func=lambda j: "Job {id} · {dibuat} · {status}".format(**jobs.set_index("id").loc[j].to_dict(), id=j))
+    job = jobs.set_index("id").loc[jid]
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Kelas selesai", f"{int(job.kelas_selesai or 0)}/{job.kelas}")
+    c2.metric("Raport", f"{int(job.raport or 0)}/{int(job.total or 0)}")
+    if job.status in ("antre", "jalan") and c3.button("⏹️ Batalkan"): batalkan_job(jid)
+    st.caption(f"Folder: `{job.folder}`")
+
+    df = progres_job(jid)
+    df["progres"] = (df["selesai"] / df["total"].where(df["total"] > 0)).fillna(0)
+    st.dataframe(df[["kelas", "status", "progres", "selesai", "total", "pesan"]], hide_index=True, use_container_width=True,
+                 column_config={"progres": st.column_config.ProgressColumn("Progres", min_value=0, max_value=1)})
+    jadi = df[df["status"] == "selesai"]
+    if not jadi.empty:
+        k = st.selectbox("Unduh ZIP kelas", jadi["kelas"])
+        path = jadi.set_index("kelas").loc[k, "zip"]
+        def baca():
+            with open(path, "rb") as f: return f.read()
+        st.download_button("⬇️ Unduh ZIP", baca, os.path.basename(path), mime="application/zip", on_click="ignore")
+
+# ==========================================
+# 3. HALAMAN GURU
+# ==========================================
+def guru_page():
+    guru = st.session_state['active_user']
+    
+    # Ambil mapel & kelas yg ditugaskan ke guru ini
+    tugas = run_query("SELECT mapel, kelas FROM penugasan WHERE guru=?", (guru,), fetch=True)
+    if not tugas: st.warning("Anda belum memiliki penugasan jadwal."); return
+    
+    # Selectbox filter
+    mapel_ajar = list(set([t[0] for t in tugas]))
+    p_mapel = st.selectbox("Pilih Mapel", mapel_ajar)
+    
+    kelas_ajar = [t[1] for t in tugas if t[0] == p_mapel]
+    p_kelas = st.selectbox("Pilih Kelas", kelas_ajar)
+    
+    st.title(f"Input Nilai: {p_mapel} - {p_kelas}")
+    
+    # Ambil KKM
+    kkm = dict(list_mapel()).get(p_mapel, 75)
+    st.info(f"KKM: {kkm}")
+    
+    # Ambil Siswa
+    siswa = siswa_kelas([p_kelas])
+    
+    t1, t2, t3 = st.tabs(["Manual", "Upload", "Copy-Paste"])
+    
+    with tab(t1, "Manual"):
+        # Grid satu kelas (1 query); saat simpan hanya sel yang berubah yang ditulis
+        asli = grid_nilai(p_kelas, p_mapel)
+        with st.form("input_manual"):
+            baru = st.data_editor(asli, key=f"grid_nilai_{p_mapel}_{p_kelas}_{st.session_state.get('grid_rev', 0)}",
+                                  disabled=["Nama"], hide_index=True, use_container_width=True,
+                                  column_config={"Nilai": st.column_config.NumberColumn(min_value=0, max_value=100, step=1,
+                                                                                      help="Kosongkan sel untuk menghapus nilai")})
+            if st.form_submit_button("Simpan"):
+                if (n := simpan(simpan_grid_nilai, asli, baru, p_mapel, p_kelas, langsung=True)) is not None:
+                    st.session_state['grid_rev'] = st.session_state.get('grid_rev', 0) + 1
+                    st.session_state['grid_msg'] = (f"{n[0]} nilai berubah tersimpan ke Database!"
+                                                    + (f" {n[1]} nilai dihapus (sel dikosongkan)." if n[1] else ""))
+                    st.rerun()
+        if 'grid_msg' in st.session_state: st.success(st.session_state.pop('grid_msg'))
+
+    with tab(t2, "Upload"):
+        st.info("File **.xlsx** / **.csv** dengan judul kolom **NISN** / **NIPD** / **Nama**, opsional **Kelas**, "
+                f"dan **Nilai** (atau kolom bernama **{p_mapel}**). Boleh berisi beberapa kelas / sheet.")
+        f = st.file_uploader("Upload File Nilai", type=["xlsx", "csv"])
+        if f is not None:
+            panel_import(f"upl_nilai_{p_mapel}_{f.file_id}",
+                         lambda: parse_nilai_file(f, f.name, siswa_kelas(kelas_ajar), p_mapel), "Proses File")
+
+    with tab(t3, "Copy-Paste"):
+        st.info("Copy kolom **Nama** dan **Nilai** dari Excel (atau **NISN/NIPD | Nama | Nilai**). "
+                "Salah ketik/urutan nama yang jelas tetap dicocokkan; cek kolom **Cocok** sebelum menyimpan.")
+        raw = st.text_area("Paste", height=200)
+        panel_import(f"imp_nilai_{p_mapel}_{p_kelas}", lambda: parse_nilai(raw, siswa, p_mapel, p_kelas))
+
+# ==========================================
+# 4. HALAMAN WALI KELAS
+# ==========================================
+def wali_page():
+    wali = st.session_state['active_user']
+    # Cari kelas binaan
+    kelas_data = [k for k, w in list_kelas() if w == wali]
+    if not kelas_data: st.warning("Anda tidak terdaftar sebagai Wali Kelas."); return
+    
+    kelas = st.selectbox("Pilih Kelas Binaan", kelas_data)
+    
+    # Semua data kelas diambil sekali (jumlah query tetap, bukan per siswa/mapel)
+    snap = load_kelas_snapshot(kelas)
+    siswa = snap["siswa"]
+    rank_map = snap["peringkat"] # dari tabel peringkat, diperbarui saat nilai ditulis
+    
+    t1, t2, t3 = st.tabs(["Non-Akademik", "Leger", "Raport"])
+    
+    with tab(t1, "Non-Akademik"):
+        # Grid satu kelas (1 query); saat simpan hanya baris yang berubah yang ditulis
+        asli = grid_non_akademik(kelas)
+        sikap = st.column_config.SelectboxColumn(options=PILIHAN_SIKAP, required=True)
+        absen = st.column_config.NumberColumn(min_value=0, max_value=100, step=1)
+        with st.form("non"):
+            baru = st.data_editor(asli, key=f"grid_non_{kelas}_{st.session_state.get('grid_rev', 0)}",
+                                  disabled=["Nama"], hide_index=True, use_container_width=True,
+                                  column_config={"Rapi": sikap, "Disiplin": sikap, "Jujur": sikap,
+                                                 "Sakit": absen, "Izin": absen, "Alpha": absen})
+            if st.form_submit_button("Simpan"):
+                if (n := simpan(simpan_grid_non_akademik, asli, baru, langsung=True)) is not None:
+                    st.session_state['grid_rev'] = st.session_state.get('grid_rev', 0) + 1
+                    st.session_state['grid_msg'] = f"{n} siswa berubah tersimpan"
+                    st.rerun()
+        if 'grid_msg' in st.session_state: st.success(st.session_state.pop('grid_msg'))
+
+    with tab(t2, "Leger"):
+        leger, mapels = load_leger(kelas)
+        st.dataframe(tabel_leger(leger, mapels), hide_index=True)
+        st.download_button("Download Excel", lambda: export_leger_xlsx(kelas), f"Leger_{kelas}.xlsx", on_click="ignore")
+
+    with tab(t3, "Raport"):
+        # Export satu kelas: dirender paralel hanya saat tombol ditekan
+        zip_key = f"zip_{kelas}"
+        if st.button("📦 Siapkan Raport Satu Kelas (ZIP)", disabled=not siswa):
+            bar = st.progress(0.0, text="Membuat raport...")
+            def lapor(n, total): bar.progress(n/total, text=f"Membuat raport {n}/{total}")
+            st.session_state[zip_key] = generate_zip_kelas(snap, progress=lapor).getvalue()
+            bar.empty()
+        if zip_key in st.session_state:
+            st.download_button("⬇️ Unduh ZIP Kelas", st.session_state[zip_key], f"Raport_{kelas}.zip", mime="application/zip")
+
+        # Per siswa: dokumen baru dibuat saat tombol Unduh diklik
+        for sid, snama, *_ in siswa:
+            c1,c2 = st.columns([4,1])
+            c1.write(f"{snama} (Rank {rank_map.get(sid)})")
+            docx = lambda sid=sid: generate_docx_db(sid, snap)
+            c2.download_button("Unduh", docx, f"Raport_{snama}.docx", key=f"dl_{sid}", on_click="ignore")
+
+# ==========================================
+# 5. LOGIN SCREEN
+# ==========================================
+def login_screen():
+    st.markdown("<h1 style='text-align:center'>SISTEM RAPORT DATABASE</h1>", unsafe_allow_html=True)
+    t1,t2,t3 = st.tabs(["ADMIN", "WALI KELAS", "GURU"])
+    
+    with tab(t1, "Admin"):
+        if st.button("Masuk Admin") and st.text_input("Password", type="password") == "admin":
+            st.session_state['login_status'] = True; st.session_state['user_role'] = 'admin'; st.rerun()
+            
+    with tab(t2, "Wali"):
+        walis = sorted({w for _, w in list_kelas() if w})
+        w = st.selectbox("Nama Wali", walis)
+        if st.button("Masuk Wali"):
+            st.session_state['login_status']=True; st.session_state['user_role']='wali'; st.session_state['active_user']=w; st.rerun()
+            
+    with tab(t3, "Guru"):
+        gurus = list(list_guru())
+        g = st.selectbox("Nama Guru", gurus)
+        if st.button("Masuk Guru"):
+            st.session_state['login_status']=True; st.session_state['user_role']='guru'; st.session_state['active_user']=g; st.rerun()
+
+with metrik.rerun(st.session_state.get('user_role', 'login') if st.session_state['login_status'] else 'login'):
+    siapkan_db(raport_db.DB_NAME)
+
+    if not st.session_state['login_status']:
+        login_screen()
+    else:
+        with st.sidebar:
+            if st.button("Keluar"): 
+                st.session_state['login_status'] = False; st.rerun()
+        
+        role = st.session_state['user_role']
+        if role == 'admin': admin_page()
+        elif role == 'guru': guru_page()
+        elif role == 'wali': wali_page()
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""Arsip term lama (tahun ajar + semester) ke file SQLite terpisah.
+
+Term yang sudah ditutup dipindahkan dari DB utama ke arsip/raport_<tahun>_<semester>.db
+berisi salinan config, mapel, kelas, siswa, nilai, non-akademik dan peringkat
+term itu. DB utama (yang ditulis guru) tetap kecil; arsip di-ATTACH read-only
+saat raport lama perlu dibuat ulang.
+
+Catatan: kelas & wali disalin apa adanya saat diarsipkan, jadi arsipkan term
+sebelum siswa dinaikkan kelas."""
+import os
+import re
+import time
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from raport_db import (connection, transaction, run_query, write, update_config,
+                       refresh_semua, sql_peringkat, term_aktif, baca_snapshot)
+
+ARSIP_DIR = "arsip"
+
+# Skema DB arsip: tabel yang dibaca baca_snapshot() / SQL_PERINGKAT dengan prefiks 'arsip.'
+SKEMA_ARSIP = [
+    "CREATE TABLE arsip.config (key TEXT PRIMARY KEY, value TEXT)",
+    "CREATE TABLE arsip.master_mapel (nama TEXT PRIMARY KEY, kkm INTEGER)",
+    "CREATE TABLE arsip.master_kelas (nama TEXT PRIMARY KEY, wali_kelas TEXT)",
+    "CREATE TABLE arsip.siswa (id INTEGER PRIMARY KEY, nama TEXT, nisn TEXT, nipd TEXT, jk TEXT, kelas TEXT)",
+    """CREATE TABLE arsip.nilai (siswa_id INTEGER, tahun_ajar TEXT, semester TEXT, mapel TEXT, nilai INTEGER,
+        PRIMARY KEY (tahun_ajar, semester, siswa_id, mapel))""",
+    """CREATE TABLE arsip.non_akademik (siswa_id INTEGER, tahun_ajar TEXT, semester TEXT,
+        rapi TEXT, disiplin TEXT, jujur TEXT, sakit INTEGER, izin INTEGER, alpha INTEGER,
+        PRIMARY KEY (tahun_ajar, semester, siswa_id))""",
+    """CREATE TABLE arsip.peringkat (siswa_id INTEGER PRIMARY KEY, kelas TEXT, total INTEGER,
+        terisi INTEGER, rata REAL, peringkat INTEGER, bawah_kkm INTEGER)""",
+    """CREATE VIEW arsip.term_aktif AS SELECT
+        (SELECT value FROM config WHERE key='tahun_ajar') AS tahun_ajar,
+        (SELECT value FROM config WHERE key='semester') AS semester""",
+    "CREATE INDEX arsip.idx_siswa_kelas ON siswa(kelas, nama)",
+    "CREATE INDEX arsip.idx_peringkat_kelas ON peringkat(kelas, peringkat)",
+]
+
+def nama_file_arsip(tahun_ajar, semester):
+    return "raport_" + re.sub(r"[^0-9A-Za-z]+", "-", f"{tahun_ajar}_{semester}").strip("-") + ".db"
+
+# ==========================================
+# DAFTAR TERM
+# ==========================================
+def daftar_term():
+    """Term yang datanya masih di DB utama: [(tahun_ajar, semester, jumlah_nilai)]"""
+    return run_query("""SELECT tahun_ajar, semester, count(*) FROM nilai GROUP BY tahun_ajar, semester
+        UNION SELECT tahun_ajar, semester, 0 FROM non_akademik
+        WHERE (tahun_ajar, semester) NOT IN (SELECT tahun_ajar, semester FROM nilai)
+        GROUP BY tahun_ajar, semester ORDER BY 1, 2""", fetch=True) or []
+
+def daftar_arsip():
+    """[(tahun_ajar, semester, file, dibuat)] term yang sudah diarsipkan"""
+    return run_query("SELECT tahun_ajar, semester, file, dibuat FROM arsip_term ORDER BY tahun_ajar, semester",
+                     fetch=True) or []
+
+def _ganti_term(tahun_ajar, semester):
+    with transaction():
+        update_config("tahun_ajar", tahun_ajar); update_config("semester", semester)
+        refresh_semua()
+
+def ganti_term(tahun_ajar, semester):
+    """Jadikan term ini aktif: input nilai, leger, monitoring & raport memakai
+    term ini; peringkat & rekap dashboard seluruh kelas dihitung ulang"""
+    tahun_ajar, semester = tahun_ajar.strip(), semester.strip()
+    if not tahun_ajar or not semester: raise ValueError("Tahun ajar dan semester wajib diisi")
+    if (tahun_ajar, semester) in {(t, s) for t, s, *_ in daftar_arsip()}:
+        raise ValueError(f"Term {tahun_ajar} {semester} sudah diarsipkan")
+    write(_ganti_term, tahun_ajar, semester)
+
+# ==========================================
+# ARSIPKAN & BACA ARSIP
+# ==========================================
+def arsipkan_term(tahun_ajar, semester, folder=None):
+    """Salin term (bukan term aktif) ke file arsip, lalu hapus dari DB utama.
+    Aman diulang: jika proses terhenti sebelum penghapusan, arsip dibuat ulang.
+    Mengembalikan (path arsip, jumlah nilai, jumlah non-akademik)."""
+    if (tahun_ajar, semester) == term_aktif():
+        raise ValueError("Term aktif tidak bisa diarsipkan; ganti term aktif dulu")
+    path = os.path.abspath(os.path.join(folder or ARSIP_DIR, nama_file_arsip(tahun_ajar, semester)))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    for akhiran in ("", "-journal", "-wal", "-shm"):
+        if os.path.exists(path + akhiran): os.remove(path + akhiran)
+    term = (tahun_ajar, semester)
+
+    # 1) Salin ke arsip (ATTACH tidak boleh di dalam transaksi)
+    with connection() as conn:
+        conn.execute("ATTACH DATABASE ? AS arsip", (path,))
+        try:
+            conn.execute("PRAGMA arsip.journal_mode=DELETE") # arsip = satu file saja
+            with transaction():
+                for sql in SKEMA_ARSIP: conn.execute(sql)
+                conn.execute("INSERT INTO arsip.config SELECT key, value FROM config WHERE key NOT IN ('tahun_ajar', 'semester')")
+                conn.execute("INSERT INTO arsip.config VALUES ('tahun_ajar', ?), ('semester', ?)", term)
+                conn.execute("INSERT INTO arsip.master_mapel SELECT nama, kkm FROM master_mapel")
+                conn.execute("INSERT INTO arsip.master_kelas SELECT nama, wali_kelas FROM master_kelas")
+                conn.execute("""INSERT INTO arsip.siswa SELECT id, nama, nisn, nipd, jk, kelas FROM siswa
+                    WHERE id IN (SELECT siswa_id FROM nilai WHERE tahun_ajar=? AND semester=?
+                                 UNION SELECT siswa_id FROM non_akademik WHERE tahun_ajar=? AND semester=?)""", term + term)
+                n_nilai = conn.execute("""INSERT INTO arsip.nilai SELECT siswa_id, tahun_ajar, semester, mapel, nilai
+                    FROM nilai WHERE tahun_ajar=? AND semester=?""", term).rowcount
+                n_non = conn.execute("""INSERT INTO arsip.non_akademik SELECT siswa_id, tahun_ajar, semester,
+                    rapi, disiplin, jujur, sakit, izin, alpha FROM non_akademik WHERE tahun_ajar=? AND semester=?""", term).rowcount
+                conn.execute(sql_peringkat(skema="arsip."))
+        finally:
+            conn.execute("DETACH DATABASE arsip")
+
+    # 2) Hapus dari DB utama + catat arsip (lewat writer thread seperti simpanan lain)
+    write(_hapus_term, term, path)
+    return path, n_nilai, n_non
+
+def _hapus_term(term, path):
+    with transaction() as conn:
+        conn.execute("DELETE FROM nilai WHERE tahun_ajar=? AND semester=?", term)
+        conn.execute("DELETE FROM non_akademik WHERE tahun_ajar=? AND semester=?", term)
+        conn.execute("INSERT OR REPLACE INTO arsip_term VALUES (?, ?, ?, ?)",
+                     (*term, path, time.strftime("%Y-%m-%d %H:%M:%S")))
+
+@contextmanager
+def buka_arsip(tahun_ajar, semester):
+    """ATTACH arsip term (read-only) sebagai skema 'arsip' pada koneksi yang dipinjam"""
+    r = run_query("SELECT file FROM arsip_term WHERE tahun_ajar=? AND semester=?", (tahun_ajar, semester), fetch=True)
+    if not r: raise ValueError(f"Arsip term {tahun_ajar} {semester} tidak ditemukan")
+    with connection() as conn:
+        conn.execute("ATTACH DATABASE ? AS arsip", (f"file:{quote(r[0][0])}?mode=ro",))
+        try: yield conn
+        finally: conn.execute("DETACH DATABASE arsip")
+
+def kelas_arsip(tahun_ajar, semester):
+    with buka_arsip(tahun_ajar, semester) as conn:
+        return [r[0] for r in conn.execute("SELECT DISTINCT kelas FROM arsip.siswa ORDER BY kelas")]
+
+def load_kelas_snapshot_arsip(kelas, tahun_ajar, semester):
+    """Seperti load_kelas_snapshot(), tetapi dari arsip term lama
+    (bisa langsung dipakai generate_docx_db / generate_zip_kelas)"""
+    with buka_arsip(tahun_ajar, semester) as conn:
+        c = conn.cursor()
+        conf = dict(c.execute("SELECT key, value FROM arsip.config"))
+        mapel = tuple(c.execute("SELECT nama, kkm FROM arsip.master_mapel"))
+        return baca_snapshot(c, kelas, conf, mapel, skema="arsip.")
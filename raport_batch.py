@@ -0,0 +1,209 @@
+"""Cetak massal raport seluruh sekolah di latar belakang.
+
+Status job disimpan di SQLite (batch_job, batch_kelas) sehingga job yang
+terputus (server mati/crash) dilanjutkan dari kelas & file yang belum selesai.
+Hasil: <BATCH_DIR>/job_NNNN/<kelas>/NN_Raport_<nama>.docx + <kelas>.zip.
+
+    python raport_batch.py                 # semua kelas
+    python raport_batch.py --kelas X-1 X-2
+    python raport_batch.py --lanjut        # lanjutkan job yang terputus"""
+import argparse
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import raport_db
+from raport_db import run_query, read_sql, write, transaction, load_kelas_snapshot, list_kelas
+from raport_docx import generate_docx_db, nama_file_raport
+
+BATCH_DIR = "raport_batch"
+POTONGAN = 8 # siswa per tugas worker
+BASI = 120 # detik tanpa detak -> job dianggap terputus dan boleh dilanjutkan
+
+def nama_aman(teks):
+    """Nama folder/file yang aman untuk sistem file"""
+    return re.sub(r'[\\/:*?"<>|]+', '_', str(teks)).strip() or "_"
+
+# ==========================================
+# STATUS JOB (SQLITE)
+# ==========================================
+def _buat_job(kelas_list, folder_dasar):
+    with transaction() as conn:
+        jid = conn.execute("INSERT INTO batch_job (dibuat, status, folder, detak) VALUES (?, 'antre', '', 0)",
+                           (time.strftime("%Y-%m-%d %H:%M:%S"),)).lastrowid
+        folder = os.path.abspath(os.path.join(folder_dasar, f"job_{jid:04d}"))
+        conn.execute("UPDATE batch_job SET folder=? WHERE id=?", (folder, jid))
+        conn.executemany("INSERT INTO batch_kelas (job_id, kelas, status) VALUES (?, ?, 'antre')",
+                         [(jid, k) for k in sorted(set(kelas_list))])
+    return jid
+
+def buat_job(kelas_list=None, folder_dasar=None, mulai=True):
+    """Antrikan job cetak (semua kelas jika kelas_list kosong) lalu jalankan
+    runner latar belakang. Mengembalikan id job."""
+    kelas_list = list(kelas_list or [k for k, _ in list_kelas()])
+    jid = write(_buat_job, kelas_list, folder_dasar or BATCH_DIR)
+    if mulai: mulai_runner()
+    return jid
+
+def _klaim_job():
+    # Job antre, atau 'jalan' yang detaknya basi (proses pemiliknya mati)
+    with transaction() as conn:
+        row = conn.execute("""SELECT id FROM batch_job WHERE status='antre'
+            OR (status='jalan' AND detak < ?) ORDER BY id LIMIT 1""", (time.time() - BASI,)).fetchone()
+        if row is None: return None
+        conn.execute("UPDATE batch_job SET status='jalan', detak=? WHERE id=?", (time.time(), row[0]))
+        return row[0]
+
+def _set_kelas(jid, kelas, kolom):
+    run_query(f"UPDATE batch_kelas SET {', '.join(f'{k}=?' for k in kolom)} WHERE job_id=? AND kelas=?",
+              (*kolom.values(), jid, kelas))
+    run_query("UPDATE batch_job SET detak=? WHERE id=?", (time.time(), jid))
+
+def _tambah_selesai(jid, kelas, n):
+    run_query("UPDATE batch_kelas SET selesai=selesai+? WHERE job_id=? AND kelas=?", (n, jid, kelas))
+    run_query("UPDATE batch_job SET detak=? WHERE id=?", (time.time(), jid))
+
+def batalkan_job(jid):
+    """Hentikan job; kelas yang sudah jadi tetap tersimpan"""
+    write(run_query, "UPDATE batch_job SET status='batal' WHERE id=? AND status IN ('antre', 'jalan')", (jid,))
+
+def status_job(jid):
+    r = run_query("SELECT status FROM batch_job WHERE id=?", (jid,), fetch=True)
+    return r[0][0] if r else None
+
+def daftar_job(n=10):
+    """Job terbaru beserta jumlah kelas & raport yang selesai"""
+    return read_sql("""SELECT j.id, j.dibuat, j.status, count(k.kelas) AS kelas,
+            sum(k.status='selesai') AS kelas_selesai, sum(k.selesai) AS raport, sum(k.total) AS total, j.folder, j.pesan
+        FROM batch_job j LEFT JOIN batch_kelas k ON k.job_id = j.id
+        GROUP BY j.id ORDER BY j.id DESC LIMIT ?""", (n,))
+
+def progres_job(jid):
+    """Progres per kelas satu job"""
+    return read_sql("SELECT kelas, status, selesai, total, zip, pesan FROM batch_kelas WHERE job_id=? ORDER BY kelas", (jid,))
+
+# ==========================================
+# WORKER & RUNNER
+# ==========================================
+def _render_potongan(snap, daftar, folder):
+    # Dijalankan di worker proses. File yang sudah ada (job dilanjutkan) dilewati;
+    # ditulis ke .tmp lalu di-rename agar file setengah jadi tidak dianggap selesai.
+    for no, sid, snama in daftar:
+        path = os.path.join(folder, nama_file_raport(no, snama))
+        if os.path.exists(path): continue
+        with open(path + ".tmp", "wb") as f: f.write(generate_docx_db(sid, snap).getvalue())
+        os.replace(path + ".tmp", path)
+    return len(daftar)
+
+def _zip_kelas(folder, daftar):
+    """ZIP satu kelas dari file yang diharapkan; sisa file lama (mis. siswa
+    yang pindah sejak job terputus) dihapus"""
+    nama = [nama_file_raport(no, snama) for no, _, snama in daftar]
+    for f in set(os.listdir(folder)) - set(nama): os.remove(os.path.join(folder, f))
+    path = folder + ".zip"
+    with zipfile.ZipFile(path + ".tmp", "w", zipfile.ZIP_DEFLATED) as zf:
+        for f in nama: zf.write(os.path.join(folder, f), f)
+    os.replace(path + ".tmp", path)
+    return path
+
+def jalankan_job(jid, max_workers=None, progress=None):
+    """Kerjakan kelas yang belum selesai dari satu job (blocking).
+    progress(kelas, selesai, total) dipanggil setiap satu potongan selesai."""
+    folder = run_query("SELECT folder FROM batch_job WHERE id=?", (jid,), fetch=True)[0][0]
+    kelas_sisa = [r[0] for r in run_query("SELECT kelas FROM batch_kelas WHERE job_id=? AND status!='selesai' ORDER BY kelas",
+                                          (jid,), fetch=True)]
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx) as ex:
+        futs, kelas_info = {}, {}
+        for kelas in kelas_sisa:
+            snap = load_kelas_snapshot(kelas)
+            dir_kelas = os.path.join(folder, nama_aman(kelas)); os.makedirs(dir_kelas, exist_ok=True)
+            daftar = [(i + 1, s[0], s[1]) for i, s in enumerate(snap["siswa"])]
+            potongan = [daftar[i:i + POTONGAN] for i in range(0, len(daftar), POTONGAN)]
+            kelas_info[kelas] = [dir_kelas, daftar, len(potongan), 0]
+            write(_set_kelas, jid, kelas, dict(status="jalan", total=len(daftar), selesai=0, pesan=None))
+            if not potongan:
+                write(_set_kelas, jid, kelas, dict(status="selesai", zip=_zip_kelas(dir_kelas, daftar)))
+            for p in potongan: futs[ex.submit(_render_potongan, snap, p, dir_kelas)] = kelas
+
+        for fut in as_completed(futs):
+            kelas = futs[fut]; info = kelas_info[kelas]
+            if info[2] is None: continue # kelas sudah gagal
+            try:
+                n = fut.result()
+            except Exception as e:
+                info[2] = None
+                for f, k in futs.items():
+                    if k == kelas: f.cancel()
+                write(_set_kelas, jid, kelas, dict(status="gagal", pesan=str(e))); continue
+            info[2] -= 1; info[3] += n
+            write(_tambah_selesai, jid, kelas, n)
+            if progress: progress(kelas, info[3], len(info[1]))
+            if info[2] == 0:
+                try: write(_set_kelas, jid, kelas, dict(status="selesai", zip=_zip_kelas(info[0], info[1])))
+                except Exception as e: write(_set_kelas, jid, kelas, dict(status="gagal", pesan=str(e)))
+            if status_job(jid) == "batal":
+                for f in futs: f.cancel()
+                return "batal"
+
+    gagal = run_query("SELECT count(*) FROM batch_kelas WHERE job_id=? AND status!='selesai'", (jid,), fetch=True)[0][0]
+    status = "gagal" if gagal else "selesai"
+    write(run_query, "UPDATE batch_job SET status=?, pesan=? WHERE id=? AND status='jalan'",
+          (status, f"{gagal} kelas gagal" if gagal else None, jid))
+    return status
+
+_runner = None
+_runner_lock = threading.Lock()
+
+def _runner_loop(max_workers):
+    while True:
+        jid = write(_klaim_job)
+        if jid is None: return
+        try: jalankan_job(jid, max_workers)
+        except Exception as e:
+            # Dibiarkan 'jalan' -> dilanjutkan lagi setelah detaknya basi
+            raport_db.on_error(f"Cetak massal job {jid} terhenti: {e}")
+
+def mulai_runner(max_workers=None):
+    """Jalankan thread latar belakang (satu per proses) yang mengerjakan job
+    antre dan melanjutkan job terputus. Aman dipanggil berulang."""
+    global _runner
+    with _runner_lock:
+        if _runner is not None and _runner.is_alive(): return False
+        _runner = threading.Thread(target=_runner_loop, args=(max_workers,), name="raport-batch", daemon=True)
+        _runner.start()
+        return True
+
+def ada_job_tertunda():
+    """Ada job antre atau job 'jalan' yang detaknya basi"""
+    return bool(run_query("""SELECT 1 FROM batch_job WHERE status='antre'
+        OR (status='jalan' AND detak < ?) LIMIT 1""", (time.time() - BASI,), fetch=True))
+
+def ada_job_aktif():
+    """Ada job antre atau sedang berjalan (di proses mana pun)"""
+    return bool(run_query("SELECT 1 FROM batch_job WHERE status IN ('antre', 'jalan') LIMIT 1", fetch=True))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Cetak massal raport (tanpa Streamlit)")
+    ap.add_argument("--kelas", nargs="*", help="default: semua kelas")
+    ap.add_argument("--db", default=raport_db.DB_NAME); ap.add_argument("--folder", default=BATCH_DIR)
+    ap.add_argument("--workers", type=int); ap.add_argument("--lanjut", action="store_true",
+                                                             help="hanya lanjutkan job antre/terputus")
+    args = ap.parse_args(argv)
+    raport_db.DB_NAME = args.db
+    raport_db.init_db()
+    if not args.lanjut: buat_job(args.kelas, args.folder, mulai=False)
+    while (jid := write(_klaim_job)) is not None:
+        t0 = time.perf_counter()
+        lapor = lambda k, n, total: print(f"\r  job {jid} {k}: {n}/{total}   ", end="", file=sys.stderr)
+        status = jalankan_job(jid, args.workers, lapor)
+        print(f"\njob {jid} {status} ({time.perf_counter() - t0:.1f} s)", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,331 @@
+"""Generator sekolah sintetis + benchmark jalur-jalur berat (tanpa Streamlit).
+
+    python raport_bench.py buat bench.db --siswa 3000 --kelas 90 --mapel 20
+    python raport_bench.py jalan bench.db --json hasil.json --banding lama.json
+
+`jalan` bekerja pada salinan sementara DB: file yang diberikan tidak diubah.
+
+Setiap benchmark dicatat waktu (min & median dari beberapa ulangan) dan jumlah
+statement SQLite yang dieksekusi. Hasil JSON bisa dibandingkan antar versi."""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import raport_cache
+import raport_db
+from raport_db import transaction, refresh_peringkat, list_kelas, list_mapel, load_kelas_snapshot
+
+NAMA_DEPAN = ["Adi", "Budi", "Citra", "Dewi", "Eka", "Fajar", "Gita", "Hadi", "Indah", "Joko", "Kurnia", "Lestari",
+              "Maya", "Nur", "Oki", "Putri", "Rizky", "Sari", "Teguh", "Utami", "Wahyu", "Yusuf", "Zahra", "Agus"]
+NAMA_BELAKANG = ["Pratama", "Saputra", "Wijaya", "Lestari", "Hidayat", "Kusuma", "Nugroho", "Santoso",
+                 "Permata", "Rahmawati", "Siregar", "Nasution", "Setiawan", "Purnomo", "Wulandari", "Halim"]
+MAPEL = ["Pendidikan Agama", "PPKn", "Bahasa Indonesia", "Matematika", "Sejarah Indonesia", "Bahasa Inggris",
+         "Seni Budaya", "PJOK", "Prakarya", "Fisika", "Kimia", "Biologi", "Ekonomi", "Geografi", "Sosiologi",
+         "Informatika", "Bahasa Jawa", "Bahasa Arab", "Antropologi", "Bimbingan Konseling"]
+
+def gunakan_db(path):
+    """Arahkan raport_db ke file DB lain (pool koneksi terpisah per path)"""
+    raport_db.DB_NAME = path
+    raport_db.bump_data_version()
+
+# ==========================================
+# GENERATOR SEKOLAH SINTETIS
+# ==========================================
+def buat_sekolah(path, siswa=3000, kelas=90, mapel=20, seed=1, terisi=1.0):
+    """Isi DB baru dengan sekolah sintetis: guru, kelas (+wali), mapel, penugasan
+    tiap mapel x kelas, siswa dibagi rata per kelas, nilai (proporsi `terisi`)
+    dan data non-akademik. Peringkat dihitung di akhir."""
+    rng = random.Random(seed)
+    gunakan_db(path)
+    raport_db.init_db()
+    mapels = [MAPEL[i % len(MAPEL)] + (f" {i // len(MAPEL) + 1}" if i >= len(MAPEL) else "") for i in range(mapel)]
+    kelas_list = [f"{['X', 'XI', 'XII'][i * 3 // kelas]}-{i % -(-kelas // 3) + 1}" for i in range(kelas)]
+    gurus = [f"Guru {i + 1:03d}" for i in range(max(mapel, kelas // 2, 1))]
+
+    with transaction() as conn:
+        conn.executemany("INSERT OR IGNORE INTO master_guru (nama) VALUES (?)", [(g,) for g in gurus])
+        conn.executemany("INSERT OR IGNORE INTO master_mapel (nama, kkm) VALUES (?,?)",
+                         [(m, rng.choice([70, 75, 78])) for m in mapels])
+        conn.executemany("INSERT OR IGNORE INTO master_kelas (nama, wali_kelas) VALUES (?,?)",
+                         [(k, gurus[i % len(gurus)]) for i, k in enumerate(kelas_list)])
+        conn.executemany("INSERT OR IGNORE INTO penugasan (guru, mapel, kelas) VALUES (?,?,?)",
+                         [(gurus[(j + i) % len(gurus)], m, k) for i, k in enumerate(kelas_list) for j, m in enumerate(mapels)])
+        awal = conn.execute("SELECT COALESCE(MAX(id), 0) FROM siswa").fetchone()[0]
+        baris_siswa = []
+        for i in range(siswa):
+            nama = f"{rng.choice(NAMA_DEPAN)} {rng.choice(NAMA_BELAKANG)} {i + 1}"
+            baris_siswa.append((awal + i + 1, nama, f"{awal + i + 1:010d}", f"{awal + i + 1:06d}",
+                                rng.choice("LP"), kelas_list[i % kelas]))
+        conn.executemany("INSERT INTO siswa (id, nama, nisn, nipd, jk, kelas) VALUES (?,?,?,?,?,?)", baris_siswa)
+        ta, sem = conn.execute("SELECT tahun_ajar, semester FROM term_aktif").fetchone()
+        conn.executemany("INSERT INTO nilai (siswa_id, mapel, nilai, tahun_ajar, semester) VALUES (?,?,?,?,?)",
+                         ((s[0], m, rng.randint(55, 100), ta, sem) for s in baris_siswa for m in mapels if rng.random() < terisi))
+        conn.executemany("""INSERT INTO non_akademik (siswa_id, rapi, disiplin, jujur, sakit, izin, alpha, tahun_ajar, semester)
+                            VALUES (?,?,?,?,?,?,?,?,?)""",
+                         ((s[0], rng.choice("AB") * 2, rng.choice("AB") * 2, rng.choice("AB") * 2,
+                           rng.randint(0, 5), rng.randint(0, 5), rng.randint(0, 3), ta, sem) for s in baris_siswa))
+        refresh_peringkat(kelas_list)
+    return {"siswa": siswa, "kelas": kelas, "mapel": mapel}
+
+# ==========================================
+# PENGHITUNG QUERY
+# ==========================================
+_jumlah_query = [0]
+_open_conn_asli = raport_db._open_conn
+
+def _open_conn_terhitung():
+    conn = _open_conn_asli()
+    conn.set_trace_callback(_hitung)
+    return conn
+
+def _hitung(_sql):
+    _jumlah_query[0] += 1
+
+def pasang_penghitung():
+    """Semua koneksi baru (pool maupun writer thread) mencatat setiap statement"""
+    raport_db._open_conn = _open_conn_terhitung
+
+# ==========================================
+# BENCHMARK
+# ==========================================
+def ukur(nama, fn, ulang=3, **info):
+    """Jalankan fn() `ulang` kali dengan cache data dikosongkan tiap kali.
+    Jumlah query = rata-rata statement per ulangan (executemany dihitung per
+    baris; query di worker proses zip_kelas tidak ikut terhitung)."""
+    waktu, query = [], 0
+    for _ in range(ulang):
+        raport_db.bump_data_version()
+        q0 = _jumlah_query[0]; t0 = time.perf_counter()
+        fn()
+        waktu.append(time.perf_counter() - t0); query += _jumlah_query[0] - q0
+    hasil = {"nama": nama, "detik_min": round(min(waktu), 5), "detik_median": round(statistics.median(waktu), 5),
+             "query": round(query / ulang, 1), "ulang": ulang, **info}
+    print(f"  {nama:<24} {hasil['detik_median'] * 1000:10.1f} ms {hasil['query']:10.1f} query", file=sys.stderr)
+    return hasil
+
+def _csv_nilai(siswa, mapel, geser):
+    out = io.StringIO()
+    out.write("NISN,Nama,Kelas,Nilai\n")
+    for sid, nama, nisn, _, kelas in siswa:
+        out.write(f"{nisn},{nama},{kelas},{(sid * 7 + geser) % 46 + 55}\n")
+    return io.BytesIO(out.getvalue().encode())
+
+def _salah_ketik(nama, i):
+    """Variasi nama seperti hasil ketik guru: urutan kata dibalik / satu huruf hilang / kapital + spasi"""
+    if i % 3 == 0: return " ".join(reversed(nama.split()))
+    if i % 3 == 1: return nama[:3] + nama[4:]
+    return f"  {nama.upper()} "
+
+def _cocok_sekolah(semua):
+    """Indeks seluruh sekolah + cocokkan semua nama (bervariasi) tanpa kelas"""
+    import raport_cocok as cocok
+    idx = cocok.buat_indeks(semua)
+    return Counter(cocok.cari(idx, _salah_ketik(s[1], i)).status for i, s in enumerate(semua))
+
+def _simpan_bersamaan(kelas_list, mapel, penyimpan, geser):
+    """`penyimpan` thread menyimpan grid nilai (kelas berbeda) bersamaan, lalu
+    dicek: semua nilai dari semua penyimpan benar-benar ter-commit.
+    Mengembalikan (nilai tersimpan, nilai dikirim)."""
+    from raport_import import grid_nilai, simpan_grid_nilai
+    gagal, harapan = [], {}
+    def kerja(i):
+        try:
+            k = kelas_list[i % len(kelas_list)]; m = mapel[i // len(kelas_list) % len(mapel)]
+            asli = grid_nilai(k, m); baru = asli.copy()
+            baru["Nilai"] = [(v * 3 + geser) % 46 + 55 for v in range(len(baru))]
+            simpan_grid_nilai(asli, baru, m, k)
+            harapan[(k, m)] = dict(baru["Nilai"].items())
+        except Exception as e: gagal.append(e)
+    ts = [threading.Thread(target=kerja, args=(i,)) for i in range(penyimpan)]
+    for t in ts: t.start()
+    for t in ts: t.join()
+    if gagal: raise gagal[0]
+    raport_db.bump_data_version()
+    tersimpan = sum(v == harapan[km].get(sid) for km in harapan for sid, v in grid_nilai(*km)["Nilai"].items())
+    dikirim = sum(len(h) for h in harapan.values())
+    if tersimpan != dikirim: raise RuntimeError(f"Simpan bersamaan: hanya {tersimpan}/{dikirim} nilai ter-commit")
+    return tersimpan, dikirim
+
+def _impor_app():
+    """Impor modul-modul app di proses Python baru (startup dingin tanpa Streamlit)"""
+    subprocess.run([sys.executable, "-c", "import raport_import, raport_leger, raport_stats, raport_docx, raport_batch, raport_arsip"],
+                   check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+def pakai_cache(folder):
+    """Aktifkan cache dokumen di folder ini (None = mati), juga untuk worker proses baru"""
+    raport_cache.CACHE_DIR = folder; os.environ["RAPORT_CACHE_DIR"] = folder or ""
+
+def jalankan(ulang=3, zip_kelas=True, penyimpan=50):
+    """Jalankan seluruh benchmark pada DB aktif; kembalikan list hasil"""
+    from raport_docx import generate_docx_db, generate_zip_kelas, render_docx
+    from raport_leger import load_leger, export_leger_xlsx
+    from raport_stats import load_monitoring, matriks_monitoring, load_rekap, load_rekap_absen, load_kkm_siswa, ringkas_rekap, sebaran_nilai
+    from raport_import import parse_siswa, parse_nilai, parse_nilai_file, siswa_kelas, apply_import, grid_nilai, simpan_grid_nilai
+
+    kelas_list = [k for k, _ in list_kelas()]; mapels = [m for m, _ in list_mapel()]
+    k, m = kelas_list[0], mapels[0]
+    snap = load_kelas_snapshot(k); sid = snap["siswa"][0][0]
+    semua = siswa_kelas(kelas_list)
+    n = {"kelas": k, "siswa_kelas": len(snap["siswa"])}
+    geser = iter(range(1, 10 ** 6))  # nilai baru tiap ulangan agar import benar-benar menulis
+
+    def paste_nilai():
+        siswa = [(s[0], s[1]) for s in semua if s[4] == k]
+        raw = "\n".join(f"{nm}\t{(i + next(geser)) % 46 + 55}" for i, (_, nm) in enumerate(siswa))
+        apply_import(parse_nilai(raw, siswa, m, k))
+    def paste_nilai_salah_ketik():
+        siswa = [s for s in semua if s[4] == k]
+        raw = "\n".join(f"{_salah_ketik(nm, i)}\t{(i + next(geser)) % 46 + 55}" for i, (_, nm, *_) in enumerate(siswa))
+        apply_import(parse_nilai(raw, siswa, m, k))
+    def paste_siswa():
+        raw = "\n".join(f"{s[4]}\t{s[1]}\t{s[3]}\tL\t{s[2]}" for s in semua)
+        parse_siswa(raw)
+    def upload_csv():
+        apply_import(parse_nilai_file(_csv_nilai(semua, m, next(geser)), "nilai.csv", siswa_kelas(kelas_list), m))
+    def grid_kelas():
+        asli = grid_nilai(k, m); baru = asli.copy()
+        baru["Nilai"] = [(v + next(geser)) % 46 + 55 for v in range(len(baru))]
+        simpan_grid_nilai(asli, baru, m, k)
+    def dashboard():
+        rekap, kkm_siswa = load_rekap(), load_kkm_siswa()
+        for by in (None, "kelas", "mapel"): ringkas_rekap(rekap, by, kkm_siswa)
+        sebaran_nilai(rekap, "kelas"); load_rekap_absen()
+
+    # Render diukur tanpa cache dokumen; versi *_cache memakai cache yang sudah terisi
+    pakai_cache(None)
+    hasil = [
+        ukur("impor_modul_app", _impor_app, ulang),
+        ukur("init_db", raport_db.init_db, ulang),
+        ukur("snapshot_kelas", lambda: load_kelas_snapshot(k), ulang, **n),
+        ukur("docx_siswa", lambda: generate_docx_db(sid, snap), ulang, **n),
+        ukur("docx_siswa_python_docx", lambda: render_docx(sid, snap), ulang, **n),
+        ukur("docx_siswa_tanpa_snap", lambda: generate_docx_db(sid), ulang, **n),
+    ]
+    if zip_kelas:
+        hasil.append(ukur("zip_kelas", lambda: generate_zip_kelas(snap), 1, **n))
+    with tempfile.TemporaryDirectory() as folder:
+        pakai_cache(folder)
+        generate_docx_db(sid, snap)
+        hasil.append(ukur("docx_siswa_cache", lambda: generate_docx_db(sid, snap), ulang, **n))
+        if zip_kelas:
+            generate_zip_kelas(snap)
+            hasil.append(ukur("zip_kelas_cache", lambda: generate_zip_kelas(snap), 1, **n))
+        pakai_cache(None)
+    hasil += [
+        ukur("leger_kelas", lambda: load_leger(k), ulang, **n),
+        ukur("leger_sekolah", lambda: load_leger(), ulang, siswa=len(semua)),
+        ukur("leger_xlsx_sekolah", lambda: export_leger_xlsx(), ulang, siswa=len(semua)),
+        ukur("monitoring", lambda: matriks_monitoring(load_monitoring()), ulang, sel=len(kelas_list) * len(mapels)),
+        ukur("dashboard", dashboard, ulang, sel=len(kelas_list) * len(mapels)),
+        ukur("peringkat_kelas", lambda: refresh_peringkat([k]), ulang, **n),
+        ukur("peringkat_sekolah", lambda: refresh_peringkat(kelas_list), ulang, kelas=len(kelas_list)),
+        ukur("paste_siswa_sekolah", paste_siswa, ulang, siswa=len(semua)),
+        ukur("paste_nilai_kelas", paste_nilai, ulang, **n),
+        ukur("paste_nilai_salah_ketik", paste_nilai_salah_ketik, ulang, **n),
+        ukur("cocok_nama_sekolah", lambda: _cocok_sekolah(semua), ulang, siswa=len(semua)),
+        ukur("upload_csv_sekolah", upload_csv, ulang, siswa=len(semua)),
+        ukur("simpan_grid_kelas", grid_kelas, ulang, **n),
+    ]
+    if penyimpan:
+        hasil.append(ukur(f"simpan_bersamaan_{penyimpan}",
+                          lambda: _simpan_bersamaan(kelas_list, mapels, penyimpan, next(geser)), 1, penyimpan=penyimpan))
+    return hasil
+
+def cek_mesin():
+    """Jumlah raport kelas pertama yang berbeda antara mesin template & python-docx (harus 0)"""
+    from raport_docx import beda_mesin
+    beda = beda_mesin(load_kelas_snapshot(list_kelas()[0][0]))
+    if beda: print(f"  GAGAL: {len(beda)} raport beda antara mesin template & python-docx", file=sys.stderr)
+    return len(beda)
+
+def info_sekolah():
+    with raport_db.connection() as conn:
+        return {t: conn.execute(f"SELECT count(*) FROM {t}").fetchone()[0]
+                for t in ("siswa", "master_kelas", "master_mapel", "nilai")}
+
+def versi_kode():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError: return None
+
+def banding(lama, baru, batas=1.2, min_ms=5):
+    """Cetak rasio waktu median & selisih query terhadap hasil lama; kembalikan
+    daftar benchmark yang melambat lebih dari `batas` kali (dan lebih dari
+    `min_ms` ms, agar noise pada operasi sangat cepat tidak ikut) atau yang
+    jumlah query-nya bertambah"""
+    sebelum = {h["nama"]: h for h in lama["hasil"]}
+    lambat = []
+    print(f"\n  {'benchmark':<24} {'lama ms':>10} {'baru ms':>10} {'rasio':>7} {'query':>14}", file=sys.stderr)
+    for h in baru["hasil"]:
+        a = sebelum.get(h["nama"])
+        if a is None: continue
+        rasio = h["detik_median"] / a["detik_median"] if a["detik_median"] else float("inf")
+        lebih_lambat = rasio > batas and (h["detik_median"] - a["detik_median"]) * 1000 > min_ms
+        tanda = " <-- lebih lambat" if lebih_lambat else " <-- query bertambah" if h["query"] > a["query"] * 1.05 + 0.5 else ""
+        if tanda: lambat.append(h["nama"])
+        print(f"  {h['nama']:<24} {a['detik_median'] * 1000:10.1f} {h['detik_median'] * 1000:10.1f} {rasio:7.2f}"
+              f" {a['query']:>6} -> {h['query']:<6}{tanda}", file=sys.stderr)
+    return lambat
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    sub = ap.add_subparsers(dest="perintah", required=True)
+    b = sub.add_parser("buat", help="buat DB sekolah sintetis")
+    b.add_argument("db"); b.add_argument("--siswa", type=int, default=3000)
+    b.add_argument("--kelas", type=int, default=90); b.add_argument("--mapel", type=int, default=20)
+    b.add_argument("--terisi", type=float, default=1.0, help="proporsi nilai yang terisi (0-1)")
+    b.add_argument("--seed", type=int, default=1); b.add_argument("--timpa", action="store_true")
+    j = sub.add_parser("jalan", help="jalankan benchmark pada DB")
+    j.add_argument("db"); j.add_argument("--ulang", type=int, default=3)
+    j.add_argument("--json", help="tulis hasil ke file ini (default: stdout)")
+    j.add_argument("--banding", help="file JSON hasil lama untuk dibandingkan")
+    j.add_argument("--tanpa-zip", action="store_true"); j.add_argument("--penyimpan", type=int, default=50)
+    args = ap.parse_args(argv)
+
+    if args.perintah == "buat":
+        if os.path.exists(args.db):
+            if not args.timpa: ap.error(f"{args.db} sudah ada (pakai --timpa)")
+            for akhiran in ("", "-wal", "-shm"):
+                if os.path.exists(args.db + akhiran): os.remove(args.db + akhiran)
+        t0 = time.perf_counter()
+        buat_sekolah(args.db, args.siswa, args.kelas, args.mapel, args.seed, args.terisi)
+        print(f"{args.db}: {info_sekolah()} ({time.perf_counter() - t0:.1f} s)", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.db): ap.error(f"{args.db} tidak ada (buat dulu dengan perintah 'buat')")
+    # Benchmark menulis nilai sintetis (paste, upload, grid, simpan bersamaan):
+    # selalu jalankan pada salinan, DB asli tidak pernah disentuh
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as folder: # koneksi pool masih terbuka (Windows)
+        salinan = os.path.join(folder, os.path.basename(args.db))
+        for akhiran in ("", "-wal"):
+            if os.path.exists(args.db + akhiran): shutil.copy(args.db + akhiran, salinan + akhiran)
+        pasang_penghitung(); gunakan_db(salinan)
+        raport_db.init_db()
+        print(f"Benchmark {args.db} (pada salinan sementara):", file=sys.stderr)
+        laporan = {"versi": versi_kode(), "waktu": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                   "python": platform.python_version(), "sekolah": info_sekolah(),
+                   "beda_mesin": cek_mesin(),
+                   "hasil": jalankan(args.ulang, not args.tanpa_zip, args.penyimpan)}
+    teks = json.dumps(laporan, indent=1)
+    if args.json:
+        with open(args.json, "w") as f: f.write(teks)
+    else: print(teks)
+    gagal = laporan["beda_mesin"] > 0
+    if args.banding:
+        with open(args.banding) as f: gagal = bool(banding(json.load(f), laporan)) or gagal
+    return 1 if gagal else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Cache dokumen raport di disk, dialamatkan oleh hash isinya (content-addressed).
+
+Kunci = sha256 dari semua input raport (lihat kunci_raport), jadi dokumen
+otomatis "kedaluwarsa" begitu salah satu inputnya berubah; tidak perlu
+invalidasi manual. Ukuran folder dibatasi (MAKS_BYTES), file yang paling lama
+tidak dipakai dibuang lebih dulu (LRU lewat mtime).
+
+Folder dari env RAPORT_CACHE_DIR (default 'raport_cache'); string kosong = mati."""
+import hashlib
+import json
+import os
+import threading
+
+CACHE_DIR = os.environ.get("RAPORT_CACHE_DIR", "raport_cache") or None
+MAKS_BYTES = int(os.environ.get("RAPORT_CACHE_MB", "200")) * 1024 * 1024
+VERSI_RAPORT = 1 # naikkan setiap tata letak raport berubah -> semua kunci lama tidak terpakai
+
+_ukuran = None # perkiraan total ukuran folder (dihitung sekali per proses)
+_lock = threading.Lock()
+statistik = {"hit": 0, "miss": 0, "buang": 0, "gagal": 0} # gagal = gagal menulis cache
+
+def kunci_raport(siswa_id, snap):
+    """Hash semua data yang tampil di raport satu siswa: config sekolah, mapel
+    & KKM, identitas, nilai, non-akademik, peringkat (dan jumlah siswa), wali"""
+    nilai = snap["nilai"].get(siswa_id, {})
+    data = {
+        "v": VERSI_RAPORT, "conf": snap["conf"], "kelas": snap["kelas"], "wali": snap["wali"],
+        "siswa": next(s for s in snap["siswa"] if s[0] == siswa_id),
+        "nilai": [(m, kkm, nilai.get(m)) for m, kkm in snap["mapel"]],
+        "non_akademik": snap["non_akademik"].get(siswa_id),
+        "peringkat": snap["peringkat"].get(siswa_id), "jumlah_siswa": len(snap["siswa"]),
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+def _path(kunci):
+    return os.path.join(CACHE_DIR, kunci[:2], kunci + ".docx")
+
+def ambil(kunci):
+    """Isi dokumen (bytes) atau None jika belum ada di cache"""
+    if CACHE_DIR is None: return None
+    path = _path(kunci)
+    try:
+        with open(path, "rb") as f: data = f.read()
+    except OSError:
+        statistik["miss"] += 1; return None
+    try: os.utime(path) # tandai baru dipakai (LRU)
+    except OSError: pass
+    statistik["hit"] += 1
+    return data
+
+def simpan(kunci, data):
+    """Tulis dokumen ke cache (atomik: .tmp lalu rename), lalu buang yang lama
+    jika folder melewati MAKS_BYTES. Cache hanya pelengkap: gagal menulis
+    (folder read-only, disk penuh, ...) diabaikan, dokumen tetap dikembalikan."""
+    global _ukuran
+    if CACHE_DIR is None: return
+    path = _path(kunci)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "wb") as f: f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        try: os.remove(tmp)
+        except OSError: pass
+        statistik["gagal"] += 1; return
+    with _lock:
+        try:
+            if _ukuran is None: _ukuran = sum(s for _, s, _ in _isi_folder())
+            else: _ukuran += len(data)
+            if _ukuran > MAKS_BYTES: _ukuran = _buang_lama(int(MAKS_BYTES * 0.8))
+        except OSError: _ukuran = None # dihitung ulang saat simpan berikutnya
+
+def _isi_folder():
+    for akar, _, files in os.walk(CACHE_DIR):
+        for f in files:
+            if not f.endswith(".docx"): continue
+            try: st = os.stat(os.path.join(akar, f))
+            except OSError: continue # dibuang proses lain
+            yield os.path.join(akar, f), st.st_size, st.st_mtime
+
+def _buang_lama(target):
+    """Hapus file dengan mtime tertua sampai total <= target; kembalikan total baru"""
+    isi = sorted(_isi_folder(), key=lambda x: x[2])
+    total = sum(s for _, s, _ in isi)
+    for path, size, _ in isi:
+        if total <= target: break
+        try: os.remove(path)
+        except OSError: continue
+        total -= size; statistik["buang"] += 1
+    return total
+
+def kosongkan():
+    """Hapus seluruh isi cache"""
+    global _ukuran
+    if CACHE_DIR is None: return
+    with _lock:
+        for path, _, _ in list(_isi_folder()):
+            try: os.remove(path)
+            except OSError: pass
+        _ukuran = 0
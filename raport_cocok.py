@@ -0,0 +1,118 @@
+"""Pencocokan baris import nilai (paste / file) dengan siswa.
+
+Indeks dibuat sekali per import dari daftar siswa. Nama dinormalisasi dulu:
+aksen dan tanda baca dibuang, spasi dirapikan, huruf kecil semua, dan
+singkatan umum diseragamkan ('M.' / 'Moh.' -> 'muhammad'). Pencarian
+dilakukan berurutan, dan langkah pertama yang menemukan siswa dipakai:
+NISN/NIPD, lalu nama persis, lalu susunan kata yang sama dengan urutan
+bebas, lalu kemiripan trigram huruf.
+
+cari() mengembalikan Hasil(status, siswa, skor, kandidat):
+    PERSIS  NISN/NIPD atau nama sama setelah normalisasi
+    MIRIP   satu kandidat jelas unggul (skor >= BATAS_COCOK, selisih >= SELISIH)
+    RAGU    beberapa kandidat hampir sama / skor tanggung -> perlu konfirmasi
+    TIDAK   tidak ada kandidat (skor < BATAS_KANDIDAT)"""
+import heapq
+import re
+import unicodedata
+from collections import Counter, namedtuple
+
+PERSIS, MIRIP, RAGU, TIDAK = "persis", "mirip", "ragu", "tidak"
+BATAS_COCOK = 0.8     # skor minimum untuk dicocokkan otomatis
+BATAS_KANDIDAT = 0.5  # di bawah ini bukan kandidat
+SELISIH = 0.1         # kandidat terbaik harus unggul sejauh ini dari kandidat kedua
+MAKS_KANDIDAT = 20    # kandidat dari indeks trigram yang dinilai penuh
+SKOR_SUBSET = 0.85    # semua kata nama yang lebih pendek ada di nama lain (nama tengah/gelar hilang)
+
+# Variasi ejaan/singkatan yang dianggap sama (setelah normalisasi)
+SINGKATAN = {
+    "m": "muhammad", "muh": "muhammad", "moh": "muhammad", "mohd": "muhammad", "mhd": "muhammad",
+    "moch": "muhammad", "mochammad": "muhammad", "mohammad": "muhammad", "muhamad": "muhammad",
+    "mochamad": "muhammad", "achmad": "ahmad", "akhmad": "ahmad", "abd": "abdul",
+}
+
+Hasil = namedtuple("Hasil", "status siswa skor kandidat")
+
+def kunci_id(v):
+    """Normalisasi NISN/NIPD: 51234567.0 / '0051234567' -> '51234567'; isian tanpa angka ('-') -> ''"""
+    if v is None: return ""
+    if isinstance(v, float) and v.is_integer(): v = int(v)
+    s = str(v).strip().lstrip("0")
+    return s if any(c.isdigit() for c in s) else ""
+
+def normalisasi_nama(nama):
+    """'  Siti  Nur'aini, S.Pd ' -> 'siti nuraini s pd'; 'M. Rizky' -> 'muhammad rizky'"""
+    s = unicodedata.normalize("NFKD", str(nama or ""))
+    s = "".join(c for c in s if not unicodedata.combining(c)).lower()
+    s = re.sub(r"['`’]", "", s) # Nur'aini = Nuraini
+    return " ".join(SINGKATAN.get(k, k) for k in re.findall(r"[a-z0-9]+", s))
+
+def _trigram(norm):
+    # Trigram per kata (diberi batas spasi) -> tidak bergantung urutan kata
+    return {f"  {k} "[i:i + 3] for k in norm.split() for i in range(len(k) + 1)}
+
+def skor_nama(a, b):
+    """Kemiripan dua nama ternormalisasi, 0-1 (Dice trigram; kata hilang -> SKOR_SUBSET)"""
+    if a == b: return 1.0
+    ga, gb = _trigram(a), _trigram(b)
+    skor = 2 * len(ga & gb) / (len(ga) + len(gb)) if ga and gb else 0.0
+    ka, kb = set(a.split()), set(b.split())
+    if ka and kb and (ka <= kb or kb <= ka): skor = max(skor, SKOR_SUBSET)
+    return skor
+
+# ==========================================
+# INDEKS & PENCARIAN
+# ==========================================
+def buat_indeks(siswa):
+    """siswa: list (id, nama[, nisn, nipd[, kelas]]). Dibuat sekali per import."""
+    idx = {"siswa": {}, "nama": {}, "kata": {}, "trigram": {}, "nisn": {}, "nipd": {}}
+    for s in siswa:
+        norm = normalisasi_nama(s[1])
+        idx["siswa"][s[0]] = (s, norm)
+        idx["nama"].setdefault(norm, []).append(s[0])
+        idx["kata"].setdefault(" ".join(sorted(norm.split())), []).append(s[0])
+        for g in _trigram(norm): idx["trigram"].setdefault(g, []).append(s[0])
+        for i, kolom in ((2, "nisn"), (3, "nipd")):
+            if len(s) > i and kunci_id(s[i]): idx[kolom].setdefault(kunci_id(s[i]), []).append(s[0])
+    # Trigram yang sangat umum (mis. awalan 'mu') tidak membedakan; dilewati saat mencari
+    # kandidat di seluruh indeks (bukan satu kelas), kecuali hanya itu yang cocok
+    idx["umum"] = max(50, len(siswa) // 10)
+    return idx
+
+def _kelas(idx, sid):
+    s = idx["siswa"][sid][0]
+    return s[4] if len(s) > 4 else None
+
+def cari(idx, nama, kelas=None, nisn=None, nipd=None):
+    """Cocokkan satu baris. kelas: batasi ke satu kelas (None = semua siswa di indeks)."""
+    pas = lambda ids: [i for i in ids if kelas is None or _kelas(idx, i) == kelas]
+    siswa = lambda sid: idx["siswa"][sid][0]
+    for kolom, v in (("nisn", nisn), ("nipd", nipd)):
+        ids = pas(idx[kolom].get(kunci_id(v), ()))
+        if len(ids) == 1: return Hasil(PERSIS, siswa(ids[0]), 1.0, [])
+
+    norm = normalisasi_nama(nama)
+    if not norm: return Hasil(TIDAK, None, 0.0, [])
+    for kolom, kunci in (("nama", norm), ("kata", " ".join(sorted(norm.split())))):
+        ids = pas(idx[kolom].get(kunci, ()))
+        if len(ids) == 1: return Hasil(PERSIS if kolom == "nama" else MIRIP, siswa(ids[0]), 1.0, [])
+        if ids: return Hasil(RAGU, None, 1.0, [(siswa(i), 1.0) for i in ids]) # nama kembar
+
+    hitung, umum = Counter(), []
+    for g in _trigram(norm):
+        ids = idx["trigram"].get(g, ())
+        if len(ids) <= idx["umum"] or kelas is not None: hitung.update(ids)
+        else: umum.append(ids)
+    if not pas(hitung):
+        for ids in umum: hitung.update(ids)
+    teratas = heapq.nlargest(MAKS_KANDIDAT, pas(hitung), key=hitung.__getitem__)
+    kandidat = sorted(((siswa(i), skor_nama(norm, idx["siswa"][i][1])) for i in teratas), key=lambda x: -x[1])
+    kandidat = [k for k in kandidat if k[1] >= BATAS_KANDIDAT]
+    if not kandidat: return Hasil(TIDAK, None, 0.0, [])
+    (s1, skor1), skor2 = kandidat[0], kandidat[1][1] if len(kandidat) > 1 else 0.0
+    if skor1 >= BATAS_COCOK and skor1 - skor2 >= SELISIH: return Hasil(MIRIP, s1, skor1, kandidat[:3])
+    return Hasil(RAGU, None, skor1, kandidat[:3])
+
+def daftar_kandidat(kandidat, dengan_kelas=False):
+    """'Budi Santoso (86%) / Budi Pratama (84%)' untuk kolom Keterangan"""
+    return " / ".join(f"{s[1]}{f' [{s[4]}]' if dengan_kelas and len(s) > 4 else ''} ({skor:.0%})" for s, skor in kandidat)
@@ -0,0 +1,600 @@
+"""Akses database SQLite sekolah (tanpa dependensi Streamlit)."""
+import functools
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import raport_metrik as metrik
+
+# ==========================================
+# KONEKSI (POOL PER PROSES)
+# ==========================================
+DB_NAME = "sekolah.db"
+
+POOL_SIZE = 8 # koneksi idle maksimum yang disimpan
+LOCK_RETRY = 5 # percobaan BEGIN IMMEDIATE saat DB terkunci proses lain
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",   # pembaca tidak memblokir penulis
+    "PRAGMA synchronous=NORMAL", # aman di WAL, jauh lebih sedikit fsync
+    "PRAGMA busy_timeout=5000",  # tunggu lock maks 5 detik
+    "PRAGMA cache_size=-16000",  # cache halaman ~16 MB
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",    # aktifkan ON DELETE CASCADE (lihat MIGRATIONS)
+)
+
+_pools = {}                 # (pid, DB_NAME) -> LifoQueue koneksi idle
+_pools_lock = threading.Lock()
+_local = threading.local()  # koneksi yang sedang dipegang thread ini
+
+class Koneksi(sqlite3.Connection):
+    """Koneksi yang query-nya diukur raport_metrik saat instrumentasi aktif"""
+    def cursor(self, factory=sqlite3.Cursor):
+        if metrik.AKTIF and factory is sqlite3.Cursor: factory = metrik.CursorTerukur
+        return super().cursor(factory)
+    def execute(self, sql, params=()):
+        if metrik.AKTIF: return self.cursor().execute(sql, params)
+        return super().execute(sql, params)
+    def executemany(self, sql, rows):
+        if metrik.AKTIF: return self.cursor().executemany(sql, rows)
+        return super().executemany(sql, rows)
+
+def _open_conn():
+    # autocommit (isolation_level=None); transaksi dibuka eksplisit lewat transaction()
+    # uri=True: arsip term di-ATTACH read-only lewat URI 'file:...?mode=ro' (raport_arsip)
+    conn = sqlite3.connect(DB_NAME, timeout=5, isolation_level=None, check_same_thread=False, factory=Koneksi, uri=True)
+    for pragma in PRAGMAS: conn.execute(pragma)
+    return conn
+
+def _pool():
+    key = (os.getpid(), DB_NAME)
+    with _pools_lock:
+        if key not in _pools: _pools[key] = queue.LifoQueue()
+        return _pools[key]
+
+@contextmanager
+def connection():
+    """Pinjam satu koneksi dari pool. Di dalam blok yang sama (mis. transaksi)
+    thread ini selalu memakai koneksi yang sama."""
+    held = getattr(_local, "conn", None)
+    if held is not None:
+        yield held; return
+    pool = _pool()
+    try: conn = pool.get_nowait()
+    except queue.Empty: conn = _open_conn()
+    _local.conn = conn
+    perubahan = conn.total_changes
+    try:
+        yield conn
+    finally:
+        _local.conn = None
+        if conn.in_transaction: conn.rollback()
+        # Ada baris yang ditulis lewat koneksi ini -> cache baca kedaluwarsa
+        if conn.total_changes != perubahan: bump_data_version()
+        if pool.qsize() < POOL_SIZE: pool.put(conn)
+        else: conn.close()
+
+@contextmanager
+def transaction():
+    """Satu transaksi tulis (BEGIN IMMEDIATE ... COMMIT). Rollback jika ada
+    exception. Transaksi bersarang ikut transaksi terluar."""
+    with connection() as conn:
+        if conn.in_transaction:
+            yield conn; return
+        for coba in range(LOCK_RETRY):
+            try:
+                conn.execute("BEGIN IMMEDIATE"); break
+            except sqlite3.OperationalError as e:
+                # busy_timeout sudah habis; mundur sebentar lalu coba lagi
+                if "locked" not in str(e) or coba == LOCK_RETRY - 1: raise
+                time.sleep(0.05 * 2 ** coba)
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback(); raise
+        conn.commit()
+
+# ==========================================
+# JALUR TULIS TUNGGAL (WRITER THREAD)
+# ==========================================
+# Simpanan dari banyak sesi (guru menyimpan nilai bersamaan) diantrikan ke satu
+# thread penulis per proses. Pekerjaan yang antre digabung dalam satu commit;
+# tiap pekerjaan dibungkus SAVEPOINT sehingga yang gagal tidak ikut
+# menggagalkan yang lain. Hasil/exception baru dikembalikan setelah COMMIT.
+WRITE_BATCH_MAX = 64
+
+_write_q = queue.Queue()
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+def _writer_loop():
+    while True:
+        jobs = [_write_q.get()]
+        while len(jobs) < WRITE_BATCH_MAX:
+            try: jobs.append(_write_q.get_nowait())
+            except queue.Empty: break
+        _run_batch([j for j in jobs if j[0].set_running_or_notify_cancel()])
+
+def _run_batch(jobs):
+    hasil = []
+    try:
+        with transaction() as conn:
+            for fut, fn, args, rek in jobs:
+                conn.execute("SAVEPOINT tulis")
+                try:
+                    with metrik.lanjutkan(rek): r = fn(*args)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO tulis"); hasil.append((fut, None, e))
+                else:
+                    hasil.append((fut, r, None))
+                conn.execute("RELEASE tulis")
+    except Exception as e:
+        # COMMIT (atau BEGIN) gagal: tidak ada yang tersimpan
+        for fut, *_ in jobs: fut.set_exception(e)
+        return
+    for fut, r, e in hasil:
+        if e is None: fut.set_result(r)
+        else: fut.set_exception(e)
+
+def submit_write(fn, *args):
+    """Antrikan fn(*args) ke thread penulis; fn berjalan di dalam transaksi
+    (boleh memakai run_query/run_many/transaction). Mengembalikan Future."""
+    global _writer_pid
+    with _writer_lock:
+        if _writer_pid != os.getpid():
+            threading.Thread(target=_writer_loop, name="raport-writer", daemon=True).start()
+            _writer_pid = os.getpid()
+    fut = Future()
+    # query pekerjaan ini dicatat ke rerun pengirimnya (jika instrumentasi aktif)
+    _write_q.put((fut, fn, args, metrik.rekaman_aktif()))
+    return fut
+
+def write(fn, *args, timeout=60):
+    """Seperti submit_write, tetapi menunggu sampai data benar-benar ter-commit.
+    Exception dari fn atau dari COMMIT dilempar ke pemanggil."""
+    held = getattr(_local, "conn", None)
+    if held is not None and held.in_transaction:
+        # Pemanggil sudah memegang transaksi tulis: ikut transaksi itu (hindari deadlock)
+        return fn(*args)
+    return submit_write(fn, *args).result(timeout)
+
+# ==========================================
+# CACHE DATA (DIINVALIDASI SAAT ADA PENULISAN)
+# ==========================================
+# Setiap penulisan lewat connection() menaikkan versi data, sehingga semua
+# hasil @cached versi lama otomatis tidak dipakai lagi. Perubahan dari proses
+# lain (mis. skrip di luar app) baru terlihat setelah ada penulisan di proses ini.
+_data_version = 0
+_version_lock = threading.Lock()
+
+def data_version():
+    return _data_version
+
+def bump_data_version():
+    global _data_version
+    with _version_lock: _data_version += 1
+
+def cached(fn):
+    """Cache LRU di memori untuk fungsi baca; kunci = versi data + DB + argumen.
+    Hasilnya dipakai bersama, jangan diubah oleh pemanggil."""
+    @functools.lru_cache(maxsize=128)
+    def _call(versi, db, *args): return fn(*args)
+    @functools.wraps(fn)
+    def wrapper(*args): return _call(_data_version, DB_NAME, *args)
+    wrapper.cache_clear = _call.cache_clear
+    return wrapper
+
+# ==========================================
+# DATABASE MANAGEMENT (SQLITE)
+# ==========================================
+def init_db():
+    """Inisialisasi Database dan Tabel jika belum ada, lalu jalankan migrasi.
+    DB yang sudah versi terbaru cukup dicek lewat user_version (tanpa kunci tulis)."""
+    if schema_version() == len(MIGRATIONS): return
+    with transaction() as conn:
+        _create_tables(conn.cursor())
+    migrate()
+
+def _create_tables(c):
+    
+    # Tabel Config (Info Sekolah)
+    c.execute('''CREATE TABLE IF NOT EXISTS config (key TEXT PRIMARY KEY, value TEXT)''')
+    
+    # Tabel Master
+    c.execute('''CREATE TABLE IF NOT EXISTS master_guru (nama TEXT PRIMARY KEY)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS master_mapel (nama TEXT PRIMARY KEY, kkm INTEGER DEFAULT 75)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS master_kelas (nama TEXT PRIMARY KEY, wali_kelas TEXT)''')
+    
+    # Tabel Siswa
+    c.execute('''CREATE TABLE IF NOT EXISTS siswa (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nama TEXT, nisn TEXT, nipd TEXT, jk TEXT, kelas TEXT,
+        UNIQUE(nisn)
+    )''')
+    
+    # Tabel Penugasan Guru (Jadwal)
+    c.execute('''CREATE TABLE IF NOT EXISTS penugasan (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guru TEXT, mapel TEXT, kelas TEXT,
+        UNIQUE(guru, mapel, kelas)
+    )''')
+    
+    # Tabel Nilai
+    c.execute('''CREATE TABLE IF NOT EXISTS nilai (
+        siswa_id INTEGER, mapel TEXT, nilai INTEGER,
+        PRIMARY KEY (siswa_id, mapel)
+    )''')
+    
+    # Tabel Non-Akademik (Absen & Kepribadian)
+    c.execute('''CREATE TABLE IF NOT EXISTS non_akademik (
+        siswa_id INTEGER PRIMARY KEY,
+        rapi TEXT, disiplin TEXT, jujur TEXT,
+        sakit INTEGER, izin INTEGER, alpha INTEGER
+    )''')
+    
+    # Default Info Sekolah jika kosong
+    c.execute("SELECT count(*) FROM config")
+    if c.fetchone()[0] == 0:
+        defaults = {
+            "nama_sekolah": "SMA ISLAM AL-GHOZALI",
+            "alamat": "Jl. Permata No. 19 Desa Curug",
+            "kepsek": "Antoni Firdaus M.Pd.",
+            "semester": "Genap", "tahun_ajar": "2024/2025",
+            "kota": "Gunungsindur", "tgl_raport": "20 Maret 2025"
+        }
+        c.executemany("INSERT INTO config VALUES (?, ?)", defaults.items())
+
+# --- TERM (TAHUN AJAR + SEMESTER) ---
+# nilai & non_akademik menyimpan tahun_ajar + semester. Term aktif = isi config
+# (view term_aktif), jadi query cukup memfilter dengan TERM_N tanpa parameter.
+def filter_term(alias="n", skema=""):
+    """Kondisi SQL 'baris milik term aktif' untuk tabel beralias `alias`
+    (skema: 'arsip.' untuk DB arsip yang di-ATTACH)"""
+    return (f"{alias}.tahun_ajar = (SELECT tahun_ajar FROM {skema}term_aktif)"
+            f" AND {alias}.semester = (SELECT semester FROM {skema}term_aktif)")
+
+TERM_N = filter_term()
+
+def term_aktif():
+    """(tahun_ajar, semester) dari config"""
+    conf = get_config()
+    return conf.get("tahun_ajar"), conf.get("semester")
+
+# Ringkasan nilai & peringkat per siswa (tabel peringkat) untuk term aktif.
+# Ranking kompetisi: total sama -> peringkat sama (1, 2, 2, 4). bawah_kkm =
+# jumlah mapel terisi di bawah KKM (dashboard: siswa < KKM). {filter}
+# membatasi kelas; {skema} kosong (DB utama) atau 'arsip.'.
+SQL_PERINGKAT = """
+INSERT INTO {skema}peringkat (siswa_id, kelas, total, terisi, rata, peringkat, bawah_kkm)
+SELECT id, kelas, total, terisi,
+       CASE WHEN terisi > 0 THEN round(total * 1.0 / terisi, 2) ELSE 0 END,
+       RANK() OVER (PARTITION BY kelas ORDER BY total DESC), bawah_kkm
+FROM (SELECT s.id, s.kelas, COALESCE(SUM(CASE WHEN m.nama IS NOT NULL THEN n.nilai END), 0) AS total,
+             COUNT(CASE WHEN m.nama IS NOT NULL AND n.nilai > 0 THEN 1 END) AS terisi,
+             COUNT(CASE WHEN n.nilai > 0 AND n.nilai < m.kkm THEN 1 END) AS bawah_kkm
+      FROM {skema}siswa s
+      LEFT JOIN {skema}nilai n ON n.siswa_id = s.id AND {term}
+      LEFT JOIN {skema}master_mapel m ON m.nama = n.mapel -- mapel yang sudah dihapus tidak dihitung
+      WHERE {filter} GROUP BY s.id)
+"""
+
+def sql_peringkat(filter="1", skema=""):
+    return SQL_PERINGKAT.format(filter=filter, skema=skema, term=filter_term("n", skema))
+
+# Rekap dashboard term aktif, diperbarui per kelas bersama peringkat (bukan saat
+# dashboard dibuka). rekap_nilai: satu baris per kelas x mapel, hanya nilai > 0
+# (terisi); jumlah_kuadrat untuk simpangan baku, s0..s4 = jumlah nilai per
+# rentang SEBARAN. rekap_absen: satu baris per kelas. Mengubah SEBARAN = migrasi baru.
+SEBARAN = [("< 60", 0, 59), ("60-69", 60, 69), ("70-79", 70, 79), ("80-89", 80, 89), ("90-100", 90, 100)]
+
+SQL_REKAP_NILAI = """
+INSERT INTO rekap_nilai (kelas, mapel, siswa, terisi, jumlah, jumlah_kuadrat, minimum, maksimum, bawah_kkm,
+                         {kolom_sebaran})
+SELECT s.kelas, m.nama, count(*), count(n.nilai), COALESCE(sum(n.nilai), 0), COALESCE(sum(n.nilai * n.nilai), 0),
+       min(n.nilai), max(n.nilai), COALESCE(sum(n.nilai < m.kkm), 0), {sebaran}
+FROM siswa s CROSS JOIN master_mapel m
+LEFT JOIN nilai n ON n.siswa_id = s.id AND n.mapel = m.nama AND n.nilai > 0 AND {term}
+WHERE {filter} GROUP BY s.kelas, m.nama
+"""
+
+SQL_REKAP_ABSEN = """
+INSERT INTO rekap_absen (kelas, siswa, terisi, sakit, izin, alpha)
+SELECT s.kelas, count(*), count(n.siswa_id), COALESCE(sum(n.sakit), 0), COALESCE(sum(n.izin), 0),
+       COALESCE(sum(n.alpha), 0)
+FROM siswa s LEFT JOIN non_akademik n ON n.siswa_id = s.id AND {term}
+WHERE {filter} GROUP BY s.kelas
+"""
+
+def sql_rekap_nilai(filter="1"):
+    return SQL_REKAP_NILAI.format(
+        filter=filter, term=TERM_N, kolom_sebaran=", ".join(f"s{i}" for i in range(len(SEBARAN))),
+        sebaran=", ".join(f"COALESCE(sum(n.nilai BETWEEN {a} AND {b}), 0)" for _, a, b in SEBARAN))
+
+def sql_rekap_absen(filter="1"):
+    return SQL_REKAP_ABSEN.format(filter=filter, term=TERM_N)
+
+# --- MIGRASI SKEMA ---
+# Versi skema disimpan di PRAGMA user_version. MIGRATIONS[i] membawa skema
+# dari versi i ke i+1; jangan ubah migrasi lama, selalu tambah di akhir.
+MIGRATIONS = [
+    ("index untuk lookup utama", [
+        "CREATE INDEX IF NOT EXISTS idx_siswa_kelas ON siswa(kelas, nama)",
+        "CREATE INDEX IF NOT EXISTS idx_penugasan_guru ON penugasan(guru)",
+        "CREATE INDEX IF NOT EXISTS idx_penugasan_mapel_kelas ON penugasan(mapel, kelas)",
+        "CREATE INDEX IF NOT EXISTS idx_master_kelas_wali ON master_kelas(wali_kelas)",
+        "CREATE INDEX IF NOT EXISTS idx_nilai_mapel ON nilai(mapel)",
+    ]),
+    ("foreign key siswa ON DELETE CASCADE (baris yatim dibuang)", [
+        """CREATE TABLE nilai_baru (
+            siswa_id INTEGER REFERENCES siswa(id) ON DELETE CASCADE,
+            mapel TEXT, nilai INTEGER,
+            PRIMARY KEY (siswa_id, mapel)
+        )""",
+        "INSERT INTO nilai_baru SELECT * FROM nilai WHERE siswa_id IN (SELECT id FROM siswa)",
+        "DROP TABLE nilai",
+        "ALTER TABLE nilai_baru RENAME TO nilai",
+        "CREATE INDEX idx_nilai_mapel ON nilai(mapel)",
+        """CREATE TABLE non_akademik_baru (
+            siswa_id INTEGER PRIMARY KEY REFERENCES siswa(id) ON DELETE CASCADE,
+            rapi TEXT, disiplin TEXT, jujur TEXT,
+            sakit INTEGER, izin INTEGER, alpha INTEGER
+        )""",
+        "INSERT INTO non_akademik_baru SELECT * FROM non_akademik WHERE siswa_id IN (SELECT id FROM siswa)",
+        "DROP TABLE non_akademik",
+        "ALTER TABLE non_akademik_baru RENAME TO non_akademik",
+    ]),
+    ("tabel peringkat (ranking per kelas yang disimpan)", [
+        """CREATE TABLE peringkat (
+            siswa_id INTEGER PRIMARY KEY REFERENCES siswa(id) ON DELETE CASCADE,
+            kelas TEXT, total INTEGER, terisi INTEGER, rata REAL, peringkat INTEGER
+        )""",
+        "CREATE INDEX idx_peringkat_kelas ON peringkat(kelas, peringkat)",
+        # bentuk SQL_PERINGKAT sebelum ada term (migrasi lama tidak boleh berubah)
+        """INSERT INTO peringkat (siswa_id, kelas, total, terisi, rata, peringkat)
+        SELECT id, kelas, total, terisi,
+               CASE WHEN terisi > 0 THEN round(total * 1.0 / terisi, 2) ELSE 0 END,
+               RANK() OVER (PARTITION BY kelas ORDER BY total DESC)
+        FROM (SELECT s.id, s.kelas, COALESCE(SUM(n.nilai), 0) AS total,
+                     COUNT(CASE WHEN n.nilai > 0 THEN 1 END) AS terisi
+              FROM siswa s LEFT JOIN nilai n
+                ON n.siswa_id = s.id AND n.mapel IN (SELECT nama FROM master_mapel)
+              GROUP BY s.id)""",
+    ]),
+    ("status job cetak massal (raport_batch)", [
+        """CREATE TABLE batch_job (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dibuat TEXT, status TEXT, folder TEXT, detak REAL, pesan TEXT
+        )""",
+        """CREATE TABLE batch_kelas (
+            job_id INTEGER REFERENCES batch_job(id) ON DELETE CASCADE,
+            kelas TEXT, status TEXT, total INTEGER DEFAULT 0, selesai INTEGER DEFAULT 0,
+            zip TEXT, pesan TEXT,
+            PRIMARY KEY (job_id, kelas)
+        )""",
+        "CREATE INDEX idx_batch_job_status ON batch_job(status)",
+    ]),
+    ("nilai & non_akademik per term (tahun_ajar + semester); data lama = term di config", [
+        """CREATE VIEW term_aktif AS SELECT
+            (SELECT value FROM config WHERE key='tahun_ajar') AS tahun_ajar,
+            (SELECT value FROM config WHERE key='semester') AS semester""",
+        """CREATE TABLE nilai_baru (
+            siswa_id INTEGER REFERENCES siswa(id) ON DELETE CASCADE,
+            tahun_ajar TEXT, semester TEXT, mapel TEXT, nilai INTEGER,
+            PRIMARY KEY (tahun_ajar, semester, siswa_id, mapel)
+        )""",
+        """INSERT INTO nilai_baru SELECT n.siswa_id, t.tahun_ajar, t.semester, n.mapel, n.nilai
+           FROM nilai n, term_aktif t""",
+        "DROP TABLE nilai",
+        "ALTER TABLE nilai_baru RENAME TO nilai",
+        "CREATE INDEX idx_nilai_mapel ON nilai(tahun_ajar, semester, mapel)",
+        "CREATE INDEX idx_nilai_siswa ON nilai(siswa_id)",
+        """CREATE TABLE non_akademik_baru (
+            siswa_id INTEGER REFERENCES siswa(id) ON DELETE CASCADE,
+            tahun_ajar TEXT, semester TEXT,
+            rapi TEXT, disiplin TEXT, jujur TEXT,
+            sakit INTEGER, izin INTEGER, alpha INTEGER,
+            PRIMARY KEY (tahun_ajar, semester, siswa_id)
+        )""",
+        """INSERT INTO non_akademik_baru SELECT n.siswa_id, t.tahun_ajar, t.semester,
+             n.rapi, n.disiplin, n.jujur, n.sakit, n.izin, n.alpha FROM non_akademik n, term_aktif t""",
+        "DROP TABLE non_akademik",
+        "ALTER TABLE non_akademik_baru RENAME TO non_akademik",
+        "CREATE INDEX idx_non_akademik_siswa ON non_akademik(siswa_id)",
+        """CREATE TABLE arsip_term (
+            tahun_ajar TEXT, semester TEXT, file TEXT, dibuat TEXT,
+            PRIMARY KEY (tahun_ajar, semester)
+        )""",
+    ]),
+    ("rekap dashboard (rekap_nilai per kelas x mapel, rekap_absen per kelas) untuk term aktif", [
+        """CREATE TABLE rekap_nilai (
+            kelas TEXT, mapel TEXT, siswa INTEGER, terisi INTEGER, jumlah INTEGER, jumlah_kuadrat INTEGER,
+            minimum INTEGER, maksimum INTEGER, bawah_kkm INTEGER, s0 INTEGER, s1 INTEGER, s2 INTEGER, s3 INTEGER, s4 INTEGER,
+            PRIMARY KEY (kelas, mapel)
+        )""",
+        """CREATE TABLE rekap_absen (
+            kelas TEXT PRIMARY KEY, siswa INTEGER, terisi INTEGER, sakit INTEGER, izin INTEGER, alpha INTEGER
+        )""",
+        # bentuk SQL_REKAP_NILAI / SQL_REKAP_ABSEN (dan SEBARAN) saat migrasi ini dibuat; siswa tanpa kelas tidak direkap
+        """INSERT INTO rekap_nilai (kelas, mapel, siswa, terisi, jumlah, jumlah_kuadrat, minimum, maksimum, bawah_kkm,
+                                 s0, s1, s2, s3, s4)
+        SELECT s.kelas, m.nama, count(*), count(n.nilai), COALESCE(sum(n.nilai), 0), COALESCE(sum(n.nilai * n.nilai), 0),
+               min(n.nilai), max(n.nilai), COALESCE(sum(n.nilai < m.kkm), 0),
+               COALESCE(sum(n.nilai BETWEEN 0 AND 59), 0), COALESCE(sum(n.nilai BETWEEN 60 AND 69), 0),
+               COALESCE(sum(n.nilai BETWEEN 70 AND 79), 0), COALESCE(sum(n.nilai BETWEEN 80 AND 89), 0),
+               COALESCE(sum(n.nilai BETWEEN 90 AND 100), 0)
+        FROM siswa s CROSS JOIN master_mapel m
+        LEFT JOIN nilai n ON n.siswa_id = s.id AND n.mapel = m.nama AND n.nilai > 0
+          AND n.tahun_ajar = (SELECT tahun_ajar FROM term_aktif) AND n.semester = (SELECT semester FROM term_aktif)
+        WHERE s.kelas != '' GROUP BY s.kelas, m.nama""",
+        """INSERT INTO rekap_absen (kelas, siswa, terisi, sakit, izin, alpha)
+        SELECT s.kelas, count(*), count(n.siswa_id), COALESCE(sum(n.sakit), 0), COALESCE(sum(n.izin), 0),
+               COALESCE(sum(n.alpha), 0)
+        FROM siswa s LEFT JOIN non_akademik n ON n.siswa_id = s.id
+          AND n.tahun_ajar = (SELECT tahun_ajar FROM term_aktif) AND n.semester = (SELECT semester FROM term_aktif)
+        WHERE s.kelas != '' GROUP BY s.kelas""",
+    ]),
+    ("peringkat.bawah_kkm: jumlah mapel di bawah KKM per siswa (dashboard siswa < KKM)", [
+        "ALTER TABLE peringkat ADD COLUMN bawah_kkm INTEGER DEFAULT 0",
+        "DELETE FROM peringkat",
+        # bentuk SQL_PERINGKAT saat migrasi ini dibuat
+        """INSERT INTO peringkat (siswa_id, kelas, total, terisi, rata, peringkat, bawah_kkm)
+        SELECT id, kelas, total, terisi,
+               CASE WHEN terisi > 0 THEN round(total * 1.0 / terisi, 2) ELSE 0 END,
+               RANK() OVER (PARTITION BY kelas ORDER BY total DESC), bawah_kkm
+        FROM (SELECT s.id, s.kelas, COALESCE(SUM(n.nilai), 0) AS total,
+                     COUNT(CASE WHEN n.nilai > 0 THEN 1 END) AS terisi,
+                     COUNT(CASE WHEN n.nilai > 0 AND n.nilai < m.kkm THEN 1 END) AS bawah_kkm
+              FROM siswa s LEFT JOIN (nilai n JOIN master_mapel m ON m.nama = n.mapel)
+                ON n.siswa_id = s.id
+                AND n.tahun_ajar = (SELECT tahun_ajar FROM term_aktif) AND n.semester = (SELECT semester FROM term_aktif)
+              WHERE s.kelas != '' GROUP BY s.id)""",
+    ]),
+]
+
+def schema_version():
+    return run_query("PRAGMA user_version", fetch=True)[0][0]
+
+def migrate():
+    """Jalankan migrasi yang belum diterapkan, masing-masing dalam satu transaksi"""
+    with connection() as conn:
+        versi = conn.execute("PRAGMA user_version").fetchone()[0]
+        for i, (_, stmts) in enumerate(MIGRATIONS[versi:], start=versi):
+            with transaction():
+                for sql in stmts: conn.execute(sql)
+                conn.execute(f"PRAGMA user_version={i+1}")
+
+# --- FUNGSI CRUD HELPER ---
+# Penampil error DB. Modul ini tidak bergantung pada Streamlit (dipakai juga
+# oleh worker proses export), jadi app menggantinya dengan st.error.
+on_error = print
+
+def run_query(query, params=(), fetch=False):
+    with connection() as conn:
+        try:
+            c = conn.execute(query, params)
+            if fetch:
+                return c.fetchall()
+        except Exception as e:
+            # Di dalam transaction(): lempar agar seluruh transaksi di-rollback
+            if conn.in_transaction: raise
+            on_error(f"Database Error: {e}")
+
+def run_many(query, rows):
+    """executemany dalam satu transaksi (satu commit untuk semua baris)"""
+    with connection() as conn:
+        try:
+            with transaction():
+                return conn.executemany(query, rows).rowcount
+        except Exception as e:
+            if conn.in_transaction: raise
+            on_error(f"Database Error: {e}")
+
+def read_sql(query, params=()):
+    """Hasil query sebagai DataFrame pandas"""
+    import pandas as pd
+    with connection() as conn:
+        return pd.read_sql(query, conn, params=params or None)
+
+@cached
+def get_config():
+    data = run_query("SELECT key, value FROM config", fetch=True)
+    return {row[0]: row[1] for row in data}
+
+def update_config(key, value):
+    run_query("INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)", (key, value))
+
+# --- DATA MASTER (CACHE) ---
+@cached
+def list_guru():
+    return tuple(r[0] for r in run_query("SELECT nama FROM master_guru ORDER BY nama", fetch=True))
+
+@cached
+def list_mapel():
+    """((nama, kkm), ...) urut sesuai tabel master_mapel"""
+    return tuple(run_query("SELECT nama, kkm FROM master_mapel", fetch=True))
+
+@cached
+def list_kelas():
+    """((nama, wali_kelas), ...)"""
+    return tuple(run_query("SELECT nama, wali_kelas FROM master_kelas ORDER BY nama", fetch=True))
+
+# ==========================================
+# PERINGKAT KELAS (TABEL peringkat)
+# ==========================================
+def refresh_peringkat(kelas_list):
+    """Hitung ulang peringkat (dan rekap dashboard) kelas yang nilainya/siswanya
+    baru berubah. Dipanggil oleh setiap jalur tulis, bukan saat halaman dibuka."""
+    kelas_list = sorted({k for k in kelas_list if k})
+    if not kelas_list: return
+    ph = ','.join('?' * len(kelas_list))
+    with transaction() as conn:
+        conn.execute(f"DELETE FROM peringkat WHERE kelas IN ({ph})", kelas_list)
+        conn.execute(sql_peringkat(f"s.kelas IN ({ph})"), kelas_list)
+        refresh_rekap(kelas_list)
+
+def refresh_semua():
+    """Bangun ulang peringkat & rekap seluruh sekolah (ganti term, atau DB diubah di luar app)"""
+    with transaction() as conn:
+        for t in ("peringkat", "rekap_nilai", "rekap_absen"): conn.execute(f"DELETE FROM {t}")
+        for sql in (sql_peringkat, sql_rekap_nilai, sql_rekap_absen): conn.execute(sql("s.kelas != ''"))
+
+def refresh_rekap(kelas_list, nilai=True, absen=True):
+    """Hitung ulang rekap_nilai / rekap_absen kelas tertentu (satu INSERT..SELECT per tabel)"""
+    kelas_list = sorted({k for k in kelas_list if k})
+    if not kelas_list: return
+    ph = ','.join('?' * len(kelas_list))
+    with transaction() as conn:
+        if nilai:
+            conn.execute(f"DELETE FROM rekap_nilai WHERE kelas IN ({ph})", kelas_list)
+            conn.execute(sql_rekap_nilai(f"s.kelas IN ({ph})"), kelas_list)
+        if absen:
+            conn.execute(f"DELETE FROM rekap_absen WHERE kelas IN ({ph})", kelas_list)
+            conn.execute(sql_rekap_absen(f"s.kelas IN ({ph})"), kelas_list)
+
+def kelas_siswa(ids):
+    """Kelas (sekarang maupun di tabel peringkat) dari sekumpulan id siswa"""
+    ids = list(ids)
+    if not ids: return []
+    ph = ','.join('?' * len(ids))
+    return [r[0] for r in run_query(f"""SELECT kelas FROM siswa WHERE id IN ({ph})
+        UNION SELECT kelas FROM peringkat WHERE siswa_id IN ({ph})""", (*ids, *ids), fetch=True)]
+
+def load_peringkat(kelas=None):
+    """{siswa_id: peringkat} satu kelas (atau semua jika kelas=None)"""
+    if kelas is None: return dict(run_query("SELECT siswa_id, peringkat FROM peringkat", fetch=True))
+    return dict(run_query("SELECT siswa_id, peringkat FROM peringkat WHERE kelas=?", (kelas,), fetch=True))
+
+# ==========================================
+# SNAPSHOT DATA SATU KELAS
+# ==========================================
+def load_kelas_snapshot(kelas):
+    """Ambil semua data raport satu kelas (term aktif): config & mapel (cache)
+    lalu 5 query (1 koneksi): siswa, wali, nilai (pivot per siswa), non-akademik, peringkat."""
+    with connection() as conn:
+        return baca_snapshot(conn.cursor(), kelas, get_config(), list_mapel())
+
+def baca_snapshot(c, kelas, conf, mapel, skema=""):
+    # skema 'arsip.': term lama dari DB arsip yang di-ATTACH (lihat raport_arsip)
+    siswa = c.execute(f"SELECT id, nama, nisn, nipd FROM {skema}siswa WHERE kelas=? ORDER BY nama", (kelas,)).fetchall()
+    wali = c.execute(f"SELECT wali_kelas FROM {skema}master_kelas WHERE nama=?", (kelas,)).fetchone()
+
+    # CROSS JOIN = urutan join tetap: siswa kelas ini (idx_siswa_kelas) lalu nilai per siswa_id,
+    # bukan seluruh nilai satu term lalu disaring per kelas
+    nilai = {s[0]: {} for s in siswa}
+    for sid, m, v in c.execute(f"""SELECT n.siswa_id, n.mapel, n.nilai FROM {skema}siswa s
+            CROSS JOIN {skema}nilai n ON n.siswa_id = s.id AND {filter_term('n', skema)} WHERE s.kelas=?""", (kelas,)):
+        nilai[sid][m] = v
+
+    non_akademik = {row[0]: row[1:] for row in c.execute(f"""SELECT n.siswa_id, n.rapi, n.disiplin, n.jujur,
+            n.sakit, n.izin, n.alpha FROM {skema}siswa s CROSS JOIN {skema}non_akademik n
+            ON n.siswa_id = s.id AND {filter_term('n', skema)} WHERE s.kelas=?""", (kelas,))}
+    peringkat = dict(c.execute(f"SELECT siswa_id, peringkat FROM {skema}peringkat WHERE kelas=?", (kelas,)))
+
+    return {
+        "kelas": kelas, "conf": conf, "mapel": mapel, "siswa": siswa,
+        "wali": wali[0] if wali and wali[0] else None,
+        "nilai": nilai, "non_akademik": non_akademik, "peringkat": peringkat,
+    }
@@ -0,0 +1,277 @@
+"""Pembuat dokumen raport (.docx) dan export ZIP satu kelas.
+
+Dua mesin render dengan tata letak yang sama (bangun_docx):
+- render_template (default): mengisi kerangka OOXML yang dibuat sekali per proses.
+- render_docx: python-docx penuh, sel demi sel.
+Mesin dipilih lewat env RAPORT_MESIN ('template' / 'python-docx')."""
+import io
+import os
+import re
+import zipfile
+import multiprocessing
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape, unescape
+
+import raport_cache
+import raport_metrik as metrik
+from raport_db import run_query, load_kelas_snapshot
+
+# Helper Docx (python-docx diimpor di dalam fungsi: baru dimuat saat dokumen
+# benar-benar dirender, bukan saat app/halaman login dibuka)
+def set_cell_bg(cell, color_hex):
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+    tcPr = cell._tc.get_or_add_tcPr(); shd = OxmlElement('w:shd')
+    shd.set(qn('w:val'), 'clear'); shd.set(qn('w:color'), 'auto'); shd.set(qn('w:fill'), color_hex); tcPr.append(shd)
+
+def terbilang(n):
+    angka = ["", "Satu", "Dua", "Tiga", "Empat", "Lima", "Enam", "Tujuh", "Delapan", "Sembilan", "Sepuluh", "Sebelas"]
+    if n < 0 or n > 100: return ""
+    elif n < 12: return angka[n]
+    elif n < 20: return angka[n-10] + " Belas"
+    elif n < 100: return angka[n//10] + " Puluh " + angka[n%10]
+    elif n == 100: return "Seratus"
+    return ""
+
+# ==========================================
+# WORD GENERATOR (AMBIL DARI DB)
+# ==========================================
+MESIN = os.environ.get("RAPORT_MESIN", "template")
+
+@metrik.diukur
+def generate_docx_db(siswa_id, snap=None):
+    """Raport satu siswa. snap: hasil load_kelas_snapshot(); jika kosong,
+    snapshot kelas siswa diambil dulu dari DB. Peringkat dibaca dari snapshot
+    (tabel peringkat). Dokumen yang inputnya tidak berubah diambil dari
+    raport_cache tanpa dirender ulang. Mesin render: MESIN."""
+    if snap is None:
+        kelas = run_query("SELECT kelas FROM siswa WHERE id=?", (siswa_id,), fetch=True)[0][0]
+        snap = load_kelas_snapshot(kelas)
+
+    kunci = raport_cache.kunci_raport(siswa_id, snap)
+    data = raport_cache.ambil(kunci)
+    if data is None:
+        render = render_docx if MESIN == "python-docx" else render_template
+        data = render(siswa_id, snap).getvalue()
+        raport_cache.simpan(kunci, data)
+    return io.BytesIO(data)
+
+def render_docx(siswa_id, snap):
+    """Bangun dokumen raport dengan python-docx (tanpa cache)"""
+    return bangun_docx(isi_raport(siswa_id, snap))
+
+def isi_raport(siswa_id, snap):
+    """Semua teks raport satu siswa dari snapshot kelas (dipakai bangun_docx dan
+    render_template, sehingga kedua mesin memakai data yang sama)"""
+    conf = snap["conf"]
+    _, nama_siswa, nisn, nipd = next(s for s in snap["siswa"] if s[0] == siswa_id)
+    non_akademik = snap["non_akademik"].get(siswa_id)
+    if non_akademik: rapi, disiplin, jujur, sakit, izin, alpha = non_akademik
+    else: rapi, disiplin, jujur, sakit, izin, alpha = "-", "-", "-", 0, 0, 0
+
+    nilai_siswa = snap["nilai"].get(siswa_id, {})
+    mapel = []; tot=0; cnt=0
+    for idx, (m_nama, m_kkm) in enumerate(snap["mapel"]):
+        val = nilai_siswa.get(m_nama, 0) or 0
+        mapel.append({"no": str(idx+1), "nama": m_nama, "kkm": str(m_kkm), "angka": str(val), "huruf": terbilang(val),
+                      "predikat": "B" if val>=m_kkm else "C" if val>0 else "-"})
+        tot+=val
+        if val>0: cnt+=1
+
+    return {
+        "nama_sekolah": conf['nama_sekolah'], "tahun_ajar": conf['tahun_ajar'], "alamat": conf['alamat'],
+        "nama": nama_siswa, "nipd": nipd, "nisn": nisn, "kelas": snap["kelas"], "mapel": mapel,
+        "jumlah": str(tot), "rata": f"{tot/cnt:.2f}" if cnt else "0",
+        "rapi": str(rapi), "disiplin": str(disiplin), "jujur": str(jujur),
+        "sakit": str(sakit), "izin": str(izin), "alpha": str(alpha),
+        "peringkat": str(snap["peringkat"].get(siswa_id, "-")), "total_siswa": str(len(snap["siswa"])),
+        "kepsek": conf['kepsek'], "kota": conf['kota'], "tgl_raport": conf['tgl_raport'],
+        "wali": snap["wali"] or "(....................)",
+    }
+
+def bangun_docx(isi):
+    """Tata letak raport (python-docx) dari hasil isi_raport()"""
+    from docx import Document
+    from docx.shared import Pt, Inches
+
+    doc = Document()
+    for section in doc.sections:
+        section.top_margin = Inches(0.5); section.bottom_margin = Inches(0.5); section.left_margin = Inches(0.5); section.right_margin = Inches(0.5)
+
+    # Header
+    p = doc.add_paragraph(isi['nama_sekolah']); p.alignment=1; p.runs[0].bold=True; p.runs[0].font.size=Pt(16)
+    doc.add_paragraph(f"LAPORAN HASIL BELAJAR - {isi['tahun_ajar']}").alignment=1
+    doc.add_paragraph(isi['alamat']).alignment=1
+    doc.add_paragraph("-" * 80).alignment=1
+    
+    # Identitas
+    ti = doc.add_table(3,4); ti.autofit=False; ti.columns[0].width=Inches(1.5)
+    ti.cell(0,0).text="Nama"; ti.cell(0,1).text=f": {isi['nama']}"; ti.cell(0,2).text="NIPD"; ti.cell(0,3).text=f": {isi['nipd']}"
+    ti.cell(1,0).text="Kelas"; ti.cell(1,1).text=f": {isi['kelas']}"; ti.cell(1,2).text="NISN"; ti.cell(1,3).text=f": {isi['nisn']}"
+    doc.add_paragraph()
+
+    # Nilai
+    tn = doc.add_table(2,6); tn.style='Table Grid'
+    h0=tn.rows[0].cells; h1=tn.rows[1].cells
+    h0[0].merge(h1[0]).text="NO"; h0[1].merge(h1[1]).text="Mata Pelajaran"; h0[2].merge(h1[2]).text="KKM"
+    h0[3].merge(h0[4]).text="Nilai"; h1[3].text="Angka"; h1[4].text="Huruf"; h0[5].merge(h1[5]).text="Predikat"
+    for c in h0+h1:
+        set_cell_bg(c, "E0F7FA"); c.paragraphs[0].alignment=1
+        for run in c.paragraphs[0].runs: run.bold=True # sel hasil merge tidak punya run
+
+    for m in isi["mapel"]:
+        r = tn.add_row().cells
+        r[0].text=m["no"]; r[1].text=m["nama"]; r[2].text=m["kkm"]; r[3].text=m["angka"]; r[4].text=m["huruf"]
+        r[5].text=m["predikat"]
+        for c in r: c.paragraphs[0].alignment=1
+        r[1].paragraphs[0].alignment=0
+
+    rs = tn.add_row().cells; rs[0].merge(rs[2]).text="Jumlah"; rs[3].text=isi["jumlah"]
+    rs[0].paragraphs[0].alignment=1; rs[3].paragraphs[0].alignment=1
+    ra = tn.add_row().cells; ra[0].merge(ra[2]).text="Rata - rata"; ra[3].text=isi["rata"]
+    ra[0].paragraphs[0].alignment=1; ra[3].paragraphs[0].alignment=1
+    doc.add_paragraph()
+
+    # Non Akademik & TTD
+    tc = doc.add_table(1,2); tc.style='Table Grid'
+    tk = tc.cell(0,0).add_table(4,2); tk.cell(0,0).text="Kepribadian"; tk.cell(1,0).text="Kerapihan"; tk.cell(1,1).text=isi["rapi"]
+    tk.cell(2,0).text="Kedisiplinan"; tk.cell(2,1).text=isi["disiplin"]; tk.cell(3,0).text="Kejujuran"; tk.cell(3,1).text=isi["jujur"]
+    ta = tc.cell(0,1).add_table(4,2); ta.cell(0,0).text="Absensi"; ta.cell(1,0).text="Sakit"; ta.cell(1,1).text=isi["sakit"]
+    ta.cell(2,0).text="Izin"; ta.cell(2,1).text=isi["izin"]; ta.cell(3,0).text="Alpha"; ta.cell(3,1).text=isi["alpha"]
+
+    doc.add_paragraph(f"\nPeringkat Kelas: {isi['peringkat']} dari {isi['total_siswa']} siswa")
+    ttd = doc.add_table(1,3); ttd.alignment=1
+    ttd.cell(0,0).text="\nOrang Tua\n\n\n(..........)"
+    ttd.cell(0,1).text=f"\nKepala Sekolah\n\n\n({isi['kepsek']})"
+    ttd.cell(0,2).text=f"\n{isi['kota']}, {isi['tgl_raport']}\nWali Kelas\n\n\n({isi['wali']})"
+    for c in ttd.rows[0].cells: c.paragraphs[0].alignment=1
+
+    bio = io.BytesIO(); doc.save(bio); bio.seek(0)
+    return bio
+
+# ==========================================
+# RENDER CEPAT (TEMPLATE OOXML)
+# ==========================================
+# Kerangka dibuat sekali per jumlah mapel: bangun_docx() dijalankan dengan teks
+# penanda di setiap isian. Hasilnya dipecah menjadi (1) ZIP bagian statis
+# (styles, theme, ...) yang sudah dikompres dan (2) document.xml yang dipotong
+# di setiap run berisi penanda. Satu raport = isi run-run itu dengan teks
+# ter-escape, lalu tambahkan document.xml ke salinan ZIP kerangka. Run ditulis
+# persis seperti python-docx menulisnya (tab -> <w:tab/>, baris baru -> <w:br/>,
+# xml:space="preserve" jika ada spasi di tepi), jadi document.xml identik.
+_PENANDA = re.compile("\ue000([^\ue001]*)\ue001")
+_RUN = re.compile(r'<w:r>(<w:rPr>(?:(?!</w:rPr>).)*</w:rPr>)?'
+                  r'((?:<w:t(?: xml:space="preserve")?>[^<]*</w:t>|<w:br/>|<w:tab/>)*)</w:r>')
+_ISI_RUN = re.compile(r'<w:t(?: xml:space="preserve")?>([^<]*)</w:t>|<w:br/>|<w:tab/>')
+_TAK_SAH_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_kerangka = {} # jumlah mapel -> (zip bagian statis, potongan document.xml) / None jika tidak didukung
+
+def _isi_penanda(isi):
+    tanda = lambda k: f"\ue000{k}\ue001"
+    out = {k: tanda(k) for k in isi if k != "mapel"}
+    out["mapel"] = [{f: tanda(f"mapel.{i}.{f}") for f in m} for i, m in enumerate(isi["mapel"])]
+    return out
+
+def _buat_kerangka(isi):
+    with zipfile.ZipFile(bangun_docx(_isi_penanda(isi))) as zf:
+        xml = zf.read("word/document.xml").decode("utf-8")
+        basis = io.BytesIO()
+        with zipfile.ZipFile(basis, "w", zipfile.ZIP_DEFLATED) as out:
+            for info in zf.infolist():
+                if info.filename != "word/document.xml": out.writestr(info, zf.read(info))
+    potongan, awal = [], 0
+    for m in _RUN.finditer(xml):
+        if "\ue000" not in m.group(2): continue
+        teks = "".join(unescape(t.group(1)) if t.group(1) is not None else "\t" if t.group(0) == "<w:tab/>" else "\n"
+                       for t in _ISI_RUN.finditer(m.group(2)))
+        potongan += [xml[awal:m.start()], (m.group(1) or "", _PENANDA.split(teks))]; awal = m.end()
+    potongan.append(xml[awal:])
+    # Penanda di luar run teks (tata letak baru yang belum didukung) -> pakai python-docx
+    if any(isinstance(p, str) and "\ue000" in p for p in potongan): return None
+    return basis.getvalue(), potongan
+
+def _run_xml(rpr, teks):
+    isi = []
+    for bagian in re.split(r"([\t\r\n])", _TAK_SAH_XML.sub("", teks)):
+        if bagian == "\t": isi.append("<w:tab/>")
+        elif bagian in ("\r", "\n"): isi.append("<w:br/>")
+        elif bagian:
+            spasi = ' xml:space="preserve"' if len(bagian.strip()) < len(bagian) else ""
+            isi.append(f"<w:t{spasi}>{escape(bagian)}</w:t>")
+    return f"<w:r>{rpr}{''.join(isi)}</w:r>" if rpr or isi else "<w:r/>"
+
+def render_template(siswa_id, snap):
+    """Raport satu siswa dari kerangka OOXML (tanpa cache); visual & document.xml
+    sama dengan render_docx, beberapa kali lebih cepat"""
+    isi = isi_raport(siswa_id, snap)
+    n = len(isi["mapel"])
+    if n not in _kerangka: _kerangka[n] = _buat_kerangka(isi)
+    if _kerangka[n] is None: return render_docx(siswa_id, snap)
+    basis, potongan = _kerangka[n]
+
+    nilai = {k: v for k, v in isi.items() if k != "mapel"}
+    for i, m in enumerate(isi["mapel"]):
+        for f, v in m.items(): nilai[f"mapel.{i}.{f}"] = v
+    xml = "".join(p if isinstance(p, str) else
+                  _run_xml(p[0], "".join(b if i % 2 == 0 else str(nilai[b]) for i, b in enumerate(p[1])))
+                  for p in potongan)
+    bio = io.BytesIO(basis)
+    with zipfile.ZipFile(bio, "a", zipfile.ZIP_DEFLATED) as zf: zf.writestr("word/document.xml", xml)
+    bio.seek(0)
+    return bio
+
+def bagian_beda(a, b):
+    """Nama bagian ZIP yang isinya berbeda antara dua .docx (bytes); untuk
+    membandingkan render_template dengan render_docx"""
+    with zipfile.ZipFile(io.BytesIO(a)) as za, zipfile.ZipFile(io.BytesIO(b)) as zb:
+        nama = set(za.namelist()) | set(zb.namelist())
+        return sorted(n for n in nama if n not in za.namelist() or n not in zb.namelist() or za.read(n) != zb.read(n))
+
+def beda_mesin(snap):
+    """id siswa dalam snapshot yang raportnya berbeda antara render_template dan render_docx"""
+    return [s[0] for s in snap["siswa"]
+            if bagian_beda(render_template(s[0], snap).getvalue(), render_docx(s[0], snap).getvalue())]
+
+# ==========================================
+# EXPORT SATU KELAS (ZIP)
+# ==========================================
+def nama_file_raport(no, snama):
+    """Nama file raport yang aman untuk arsip ZIP / sistem file"""
+    bersih = re.sub(r'[\\/:*?"<>|]+', '_', snama).strip() or "Siswa"
+    return f"{no:02d}_Raport_{bersih}.docx"
+
+_worker_snap = None
+
+def _init_worker(snap):
+    # Snapshot kelas dikirim sekali per worker, bukan per dokumen
+    global _worker_snap
+    _worker_snap = snap
+
+def _render_raport(args):
+    # Dijalankan di worker proses: harus top-level agar bisa di-pickle
+    return generate_docx_db(args, _worker_snap).getvalue()
+
+@metrik.diukur
+def generate_zip_kelas(snap, progress=None, max_workers=None):
+    """Render raport seluruh siswa dalam snapshot kelas dan tulis satu per satu
+    ke dalam satu ZIP. progress(selesai, total) dipanggil setiap satu dokumen
+    masuk ke ZIP. Mesin python-docx dijalankan di process pool; mesin template
+    cukup di proses ini (lebih cepat dari biaya menyalakan worker)."""
+    siswa = snap["siswa"]; total = len(siswa)
+    jobs = [s[0] for s in siswa]
+    bio = io.BytesIO()
+    with zipfile.ZipFile(bio, "w", zipfile.ZIP_DEFLATED) as zf, ExitStack() as stack:
+        if MESIN == "python-docx":
+            # spawn: aman dipakai dari proses server Streamlit yang multi-thread
+            ctx = multiprocessing.get_context("spawn")
+            ex = stack.enter_context(ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx,
+                                                         initializer=_init_worker, initargs=(snap,)))
+            hasil = ex.map(_render_raport, jobs, chunksize=4)
+        else:
+            hasil = (generate_docx_db(sid, snap).getvalue() for sid in jobs)
+        for idx, data in enumerate(hasil):
+            zf.writestr(nama_file_raport(idx+1, siswa[idx][1]), data)
+            if progress: progress(idx+1, total)
+    bio.seek(0)
+    return bio
@@ -0,0 +1,356 @@
+"""Import massal (paste Excel) siswa, data master dan nilai.
+
+Semua input di-parse dan divalidasi dulu menjadi sebuah *rencana import*:
+laporan per baris (baru / ubah / sama / ditolak) + daftar operasi SQL.
+Rencana baru ditulis ke DB lewat apply_import() dalam satu transaksi."""
+from collections import Counter
+
+import raport_cocok as cocok
+from raport_db import (run_query, run_many, read_sql, write, refresh_peringkat, refresh_rekap, kelas_siswa,
+                       list_guru, list_mapel, list_kelas, TERM_N, filter_term)
+
+BARU, UBAH, SAMA, DITOLAK = "baru", "ubah", "sama", "ditolak"
+RAGU = "ragu" # nama mirip beberapa siswa: tidak ditulis, perlu diperjelas
+
+def split_baris(line):
+    """Pecah satu baris paste Excel (tab) atau CSV (koma)"""
+    p = line.split('\t') if '\t' in line else line.split(',')
+    return [x.strip() for x in p]
+
+def _lapor(laporan, baris, status, ket="", **data):
+    laporan.append({"Baris": baris, "Status": status, "Keterangan": ket, **data})
+
+def _rencana(laporan, *ops, peringkat=()):
+    # peringkat: kelas yang ranking & rekap dashboard-nya harus dihitung ulang setelah ditulis
+    ops = [op for op in ops if op[1]]
+    return {"laporan": laporan, "ops": ops, "peringkat": sorted(set(peringkat)) if ops else []}
+
+def ringkasan(plan):
+    """Jumlah baris per status, mis. {'baru': 30, 'ditolak': 2}"""
+    return dict(Counter(r["Status"] for r in plan["laporan"]))
+
+def _tulis_rencana(plan):
+    for sql, rows in plan["ops"]:
+        run_many(sql, rows)
+    refresh_peringkat(plan["peringkat"])
+
+def apply_import(plan):
+    """Tulis semua operasi rencana dalam satu transaksi (semua atau tidak sama
+    sekali) lewat jalur tulis tunggal; kembali setelah data ter-commit."""
+    write(_tulis_rencana, plan)
+    return ringkasan(plan)
+
+# ==========================================
+# SISWA
+# ==========================================
+def parse_siswa(raw, tambah_kelas=True):
+    """Format: KELAS | Nama | NIPD | JK | NISN. Siswa lama dicocokkan lewat
+    NISN (atau Nama+Kelas jika NISN kosong) lalu di-UPDATE agar id dan
+    nilainya tetap; kelas yang belum ada ditambahkan jika tambah_kelas."""
+    kelas_ada = {k for k, _ in list_kelas()}
+    lama = run_query("SELECT id, nama, nisn, nipd, jk, kelas FROM siswa", fetch=True)
+    by_nisn = {r[2]: r for r in lama if r[2] and r[2] != "-"}
+    by_nama = {(r[1].lower(), r[5]): r for r in lama}
+    by_id = {r[0]: r for r in lama}
+
+    laporan, baru, ubah, kelas_baru = [], [], [], set()
+    nisn_dipakai = {}
+    for no, line in enumerate(raw.strip().split('\n'), start=1):
+        p = split_baris(line)
+        if not line.strip(): continue
+        if p[0].upper() == "KELAS": continue # baris judul
+        if len(p) < 2 or not p[0] or not p[1]:
+            _lapor(laporan, no, DITOLAK, "Kelas/Nama kosong", Data=line.strip()); continue
+        k, n = p[0], p[1]
+        nipd = p[2] if len(p)>2 and p[2] else "-"; jk = (p[3] if len(p)>3 and p[3] else "-").upper()
+        nisn = p[4] if len(p)>4 and p[4] not in ("", "-") else None
+        data = dict(Kelas=k, Nama=n, NIPD=nipd, JK=jk, NISN=nisn or "-")
+
+        if jk not in ("L", "P", "-"):
+            _lapor(laporan, no, DITOLAK, f"JK '{jk}' harus L/P", **data); continue
+        if nisn and nisn in nisn_dipakai:
+            _lapor(laporan, no, DITOLAK, f"NISN duplikat dengan baris {nisn_dipakai[nisn]}", **data); continue
+        if k not in kelas_ada and k not in kelas_baru:
+            if not tambah_kelas:
+                _lapor(laporan, no, DITOLAK, f"Kelas '{k}' tidak dikenal", **data); continue
+            kelas_baru.add(k)
+        if nisn: nisn_dipakai[nisn] = no
+
+        cur = by_nisn.get(nisn) if nisn else by_nama.get((n.lower(), k))
+        if cur is None:
+            baru.append((n, nisn, nipd, jk, k))
+            _lapor(laporan, no, BARU, "kelas baru" if k in kelas_baru else "", **data)
+        elif (cur[1], cur[3], cur[4], cur[5]) == (n, nipd, jk, k):
+            _lapor(laporan, no, SAMA, **data)
+        else:
+            ubah.append((n, nisn or cur[2], nipd, jk, k, cur[0]))
+            beda = [f for f, a, b in (("Nama", cur[1], n), ("NIPD", cur[3], nipd), ("JK", cur[4], jk), ("Kelas", cur[5], k)) if a != b]
+            _lapor(laporan, no, UBAH, "berubah: " + ", ".join(beda), **data)
+
+    return _rencana(laporan,
+        ("INSERT OR IGNORE INTO master_kelas (nama) VALUES (?)", [(k,) for k in sorted(kelas_baru)]),
+        ("INSERT INTO siswa (nama, nisn, nipd, jk, kelas) VALUES (?,?,?,?,?)", baru),
+        ("UPDATE siswa SET nama=?, nisn=?, nipd=?, jk=?, kelas=? WHERE id=?", ubah),
+        peringkat=[r[4] for r in baru + ubah] + [by_id[r[5]][5] for r in ubah])
+
+# ==========================================
+# DATA MASTER (GURU / MAPEL / KELAS)
+# ==========================================
+def _parse_master(raw, ada, kolom="Nama"):
+    laporan, dilihat = [], {}
+    for no, line in enumerate(raw.split('\n'), start=1):
+        # Hanya dipecah di tab: nama guru boleh mengandung koma (gelar)
+        nama = line.split('\t')[0].strip()
+        if not nama: continue
+        if nama in dilihat:
+            _lapor(laporan, no, DITOLAK, f"duplikat dengan baris {dilihat[nama]}", **{kolom: nama}); continue
+        dilihat[nama] = no
+        _lapor(laporan, no, SAMA if nama in ada else BARU, "sudah ada" if nama in ada else "", **{kolom: nama})
+    return laporan
+
+def parse_guru(raw):
+    laporan = _parse_master(raw, set(list_guru()), "Guru")
+    return _rencana(laporan, ("INSERT OR IGNORE INTO master_guru (nama) VALUES (?)",
+                              [(r["Guru"],) for r in laporan if r["Status"] == BARU]))
+
+def parse_kelas(raw):
+    laporan = _parse_master(raw, {k for k, _ in list_kelas()}, "Kelas")
+    return _rencana(laporan, ("INSERT OR IGNORE INTO master_kelas (nama) VALUES (?)",
+                              [(r["Kelas"],) for r in laporan if r["Status"] == BARU]))
+
+def parse_mapel(raw, kkm_default=75):
+    """Satu mapel per baris, opsional kolom kedua KKM dipisah tab (mis. 'Fisika<TAB>70').
+    Mapel yang sudah ada hanya diubah jika KKM diisi dan berbeda."""
+    kkm_lama = dict(list_mapel())
+    laporan, baru, ubah = [], [], []
+    for r in _parse_master(raw, set(kkm_lama), "Mapel"):
+        p = [x.strip() for x in raw.split('\n')[r["Baris"]-1].split('\t')]
+        kkm_isi = p[1] if len(p) > 1 and p[1] else None
+        if r["Status"] != DITOLAK and kkm_isi is not None:
+            try: kkm = int(float(kkm_isi))
+            except ValueError: kkm = None
+            if kkm is None or not 0 <= kkm <= 100:
+                r.update(Status=DITOLAK, Keterangan=f"KKM '{kkm_isi}' bukan angka 0-100")
+        else: kkm = kkm_lama.get(r["Mapel"], kkm_default)
+        r["KKM"] = kkm if r["Status"] != DITOLAK else kkm_isi
+        if r["Status"] == BARU: baru.append((r["Mapel"], kkm))
+        elif r["Status"] == SAMA and kkm_isi is not None and kkm != kkm_lama[r["Mapel"]]:
+            r.update(Status=UBAH, Keterangan=f"KKM {kkm_lama[r['Mapel']]} → {kkm}"); ubah.append((kkm, r["Mapel"]))
+        laporan.append(r)
+    return _rencana(laporan,
+        ("INSERT OR IGNORE INTO master_mapel (nama, kkm) VALUES (?,?)", baru),
+        ("UPDATE master_mapel SET kkm=? WHERE nama=?", ubah),
+        peringkat=[k for k, _ in list_kelas()]) # mapel/KKM dipakai peringkat & rekap semua kelas
+
+# ==========================================
+# NILAI (PASTE / UPLOAD GURU)
+# ==========================================
+# Nilai selalu ditulis ke term aktif (tahun_ajar + semester di config)
+SQL_NILAI = """INSERT OR REPLACE INTO nilai (siswa_id, mapel, nilai, tahun_ajar, semester)
+    SELECT ?, ?, ?, tahun_ajar, semester FROM term_aktif"""
+SQL_HAPUS_NILAI = f"DELETE FROM nilai WHERE siswa_id = ? AND mapel = ? AND {filter_term('nilai')}"
+
+def baca_nilai(txt):
+    """Teks/angka sel -> (nilai, pesan_error)"""
+    if txt is None or str(txt).strip() == "": return None, "nilai kosong"
+    try: val = int(float(str(txt).strip().replace(',', '.')))
+    except ValueError: return None, f"nilai '{txt}' bukan angka"
+    if not 0 <= val <= 100: return None, f"nilai {val} di luar 0-100"
+    return val, None
+
+def _nilai_lama(mapel, ids):
+    if not ids: return {}
+    return dict(run_query(f"SELECT siswa_id, nilai FROM nilai n WHERE mapel=? AND {TERM_N} AND siswa_id IN ({','.join('?'*len(ids))})",
+                          (mapel, *ids), fetch=True) or [])
+
+def _pengumpul_nilai(mapel, lama):
+    """Laporan + baris tulis untuk nilai yang sudah cocok dengan siswa;
+    siswa yang muncul dua kali ditolak, nilai yang tidak berubah tidak ditulis."""
+    laporan, rows, dipakai = [], [], {}
+    def tambah(no, sid, nama, val, **data):
+        if sid in dipakai:
+            _lapor(laporan, no, DITOLAK, f"siswa sama dengan baris {dipakai[sid]}", Nama=nama, Nilai=val, **data); return
+        dipakai[sid] = no
+        if lama.get(sid) == val: _lapor(laporan, no, SAMA, Nama=nama, Nilai=val, **data); return
+        ket = f"{lama[sid]} → {val}" if sid in lama else ""
+        _lapor(laporan, no, UBAH if sid in lama else BARU, ket, Nama=nama, Nilai=val, **data)
+        rows.append((sid, mapel, val))
+    return laporan, rows, tambah
+
+def _cocokkan(laporan, tambah, idx, no, nm, val, kelas=None, nisn=None, nipd=None, ket_tidak="",
+              dengan_kelas=False, **data):
+    """Cari siswa baris ini di indeks raport_cocok lalu laporkan: cocok (persis/mirip)
+    -> ditulis, ragu -> RAGU + kandidat, tidak ada -> DITOLAK"""
+    h = cocok.cari(idx, nm, kelas, nisn, nipd)
+    if h.status == cocok.RAGU:
+        _lapor(laporan, no, RAGU, "mirip: " + cocok.daftar_kandidat(h.kandidat, dengan_kelas)
+               + " (perjelas nama atau pakai NISN)", Nama=nm, Nilai=val, **data); return
+    if h.status == cocok.TIDAK:
+        _lapor(laporan, no, DITOLAK, ket_tidak, Nama=nm, Nilai=val, **data); return
+    s = h.siswa
+    if dengan_kelas: data = {"Kelas": s[4], **data}
+    if h.status == cocok.MIRIP: data = {"Cocok": f"mirip {h.skor:.0%}", "Input": nm, **data}
+    elif nm and cocok.normalisasi_nama(nm) != cocok.normalisasi_nama(s[1]): # kunci NISN/NIPD, nama beda
+        data = {"Cocok": "NISN/NIPD", "Input": nm, **data}
+    tambah(no, s[0], s[1], val, **data)
+
+def _seperti_id(teks):
+    # NISN/NIPD: angka minimal 4 digit (nilai paling banyak 3 digit)
+    return teks.isdigit() and len(teks) >= 4
+
+def parse_nilai(raw, siswa, mapel, kelas):
+    """Paste 'Nama | Nilai' (atau 'NISN/NIPD | Nama | Nilai', 'NISN/NIPD | Nilai')
+    untuk satu mapel. siswa: list (id, nama, nisn, nipd) satu kelas. Nama
+    dicocokkan lewat indeks raport_cocok: beda huruf/aksen/tanda baca/urutan kata
+    tetap cocok, salah ketik dicocokkan jika jelas (kolom Cocok), yang meragukan
+    dilaporkan RAGU dan tidak ditulis."""
+    idx = cocok.buat_indeks(siswa)
+    laporan, rows, tambah = _pengumpul_nilai(mapel, _nilai_lama(mapel, [s[0] for s in siswa]))
+    for no, line in enumerate(raw.split('\n'), start=1):
+        if not line.strip(): continue
+        p = split_baris(line)
+        kunci = p.pop(0) if len(p) > 1 and _seperti_id(p[0]) else None
+        if len(p) < 2 and not kunci:
+            _lapor(laporan, no, DITOLAK, "kolom Nilai tidak ada", Nama=p[0]); continue
+        nm, txt = (p[0], p[1]) if len(p) > 1 else ("", p[0])
+        # Baris judul ('Nama | Nilai' / 'NISN | Nama | Nilai') dilewati tanpa laporan
+        if no == 1 and nm.lower() in ("nama", "nama siswa", "nisn", "nipd"): continue
+        val, err = baca_nilai(txt)
+        id_data = {"NISN/NIPD": kunci} if kunci else {}
+        if err:
+            _lapor(laporan, no, DITOLAK, err, Nama=nm, **id_data); continue
+        _cocokkan(laporan, tambah, idx, no, nm, val, nisn=kunci, nipd=kunci,
+                  ket_tidak="siswa tidak ditemukan di kelas", **id_data)
+    return _rencana(laporan, (SQL_NILAI, rows), peringkat=[kelas])
+
+# --- Upload file (XLSX / CSV) ---
+KOLOM_FILE = {"nama": ("nama", "nama siswa", "nama peserta didik"), "nisn": ("nisn",),
+              "nipd": ("nipd", "nis"), "kelas": ("kelas", "rombel"), "nilai": ("nilai", "nilai akhir")}
+
+def iter_baris_file(f, nama_file, chunksize=1000):
+    """Baca file baris demi baris tanpa memuat seluruh isi ke memori.
+    Menghasilkan (nama_sheet, no_baris, list_sel); baris pertama tiap sheet = judul.
+    XLSX: openpyxl read_only (semua sheet). CSV: pandas per chunk, pemisah dideteksi otomatis."""
+    if nama_file.lower().endswith(".csv"):
+        import pandas as pd
+        for chunk in pd.read_csv(f, sep=None, engine="python", dtype=str, keep_default_na=False,
+                                 header=None, chunksize=chunksize, encoding="utf-8-sig"):
+            for no, row in zip(chunk.index, chunk.itertuples(index=False)):
+                yield "", no + 1, list(row)
+    else:
+        from openpyxl import load_workbook
+        wb = load_workbook(f, read_only=True, data_only=True)
+        try:
+            for ws in wb.worksheets:
+                for no, row in enumerate(ws.iter_rows(values_only=True), start=1):
+                    yield ws.title, no, list(row)
+        finally:
+            wb.close()
+
+def _peta_kolom(header, mapel):
+    """Indeks kolom per field dari baris judul; kolom bernama mapel dipakai sebagai Nilai"""
+    judul = [str(h).strip().lower() if h is not None else "" for h in header]
+    kol = {}
+    for field, alias in KOLOM_FILE.items():
+        kol[field] = next((i for i, h in enumerate(judul) if h in alias), None)
+    if kol["nilai"] is None:
+        kol["nilai"] = next((i for i, h in enumerate(judul) if h == mapel.lower()), None)
+    return kol
+
+def parse_nilai_file(f, nama_file, siswa, mapel):
+    """Import nilai satu mapel dari file XLSX/CSV yang boleh berisi beberapa kelas.
+    siswa: list (id, nama, nisn, nipd, kelas) semua kelas ajar. Siswa dicocokkan
+    lewat NISN, lalu NIPD, lalu Nama (indeks raport_cocok, dibatasi Kelas dari
+    kolom Kelas atau nama sheet jika ada)."""
+    idx = cocok.buat_indeks(siswa)
+    kelas_ada = {s[4] for s in siswa}
+
+    laporan, rows, tambah = _pengumpul_nilai(mapel, _nilai_lama(mapel, [s[0] for s in siswa]))
+    sheet_aktif, kol = None, None
+    for sheet, no, row in iter_baris_file(f, nama_file):
+        if sheet != sheet_aktif or kol is None:
+            sheet_aktif, kol = sheet, _peta_kolom(row, mapel)
+            if kol["nilai"] is None or (kol["nama"] is None and kol["nisn"] is None and kol["nipd"] is None):
+                _lapor(laporan, no, DITOLAK, "judul kolom Nama/NISN dan Nilai tidak ditemukan", Sheet=sheet)
+                kol = {}
+            continue
+        if not kol or not any(v not in (None, "") for v in row): continue
+        sel = lambda field: row[kol[field]] if kol[field] is not None and kol[field] < len(row) else None
+        nm = str(sel("nama") or "").strip()
+        kelas = str(sel("kelas") or "").strip() or (sheet if sheet in kelas_ada else "")
+        lokasi = {"Sheet": sheet} if sheet else {}
+
+        val, err = baca_nilai(sel("nilai"))
+        if err:
+            _lapor(laporan, no, DITOLAK, err, Nama=nm, **lokasi); continue
+        _cocokkan(laporan, tambah, idx, no, nm, val, kelas or None, sel("nisn"), sel("nipd"),
+                  ket_tidak="siswa tidak ditemukan di kelas ajar", dengan_kelas=True, **lokasi)
+    kelas_id = {s[0]: s[4] for s in siswa}
+    return _rencana(laporan, (SQL_NILAI, rows), peringkat=[kelas_id[r[0]] for r in rows])
+
+def siswa_kelas(kelas_list):
+    """(id, nama, nisn, nipd, kelas) seluruh siswa di beberapa kelas sekaligus"""
+    if not kelas_list: return []
+    return run_query(f"SELECT id, nama, nisn, nipd, kelas FROM siswa WHERE kelas IN ({','.join('?'*len(kelas_list))}) ORDER BY kelas, nama",
+                     tuple(kelas_list), fetch=True) or []
+
+# ==========================================
+# INPUT GRID (st.data_editor) - HANYA SEL YANG BERUBAH DITULIS
+# ==========================================
+PILIHAN_SIKAP = ["-", "AA", "BB"]
+
+def baris_berubah(asli, baru, kolom):
+    """Baris `baru` yang berbeda dari `asli` di salah satu kolom (index sama)"""
+    a = asli[kolom].astype("object").where(asli[kolom].notna(), None)
+    b = baru[kolom].astype("object").where(baru[kolom].notna(), None)
+    return baru[(a != b).any(axis=1)]
+
+def grid_nilai(kelas, mapel):
+    """Nilai satu mapel untuk seluruh kelas dalam satu query; index = id siswa.
+    Siswa yang belum punya nilai bernilai kosong (NA)."""
+    df = read_sql(f"""SELECT s.id, s.nama AS Nama, n.nilai AS Nilai FROM siswa s
+        LEFT JOIN nilai n ON n.siswa_id = s.id AND n.mapel = ? AND {TERM_N}
+        WHERE s.kelas = ? ORDER BY s.nama""", (mapel, kelas))
+    return df.set_index("id").astype({"Nilai": "Int64"})
+
+def simpan_grid_nilai(asli, baru, mapel, kelas):
+    """Tulis hanya nilai yang diubah dalam satu transaksi; sel yang dikosongkan
+    = nilai dihapus. Lalu perbarui peringkat kelas.
+    Mengembalikan (jumlah nilai ditulis, jumlah nilai dihapus)."""
+    ubah = baris_berubah(asli, baru, ["Nilai"])
+    isi = ubah["Nilai"].dropna()
+    rows = [(int(sid), mapel, max(0, min(100, int(v)))) for sid, v in isi.items()]
+    kosong = ubah.index.difference(isi.index)
+    hapus = [(int(sid), mapel) for sid in kosong[asli.loc[kosong, "Nilai"].notna().to_numpy()]]
+    ops = [(sql, r) for sql, r in ((SQL_NILAI, rows), (SQL_HAPUS_NILAI, hapus)) if r]
+    if ops: write(_tulis_rencana, {"ops": ops, "peringkat": [kelas]})
+    return len(rows), len(hapus)
+
+def grid_non_akademik(kelas):
+    """Kepribadian & absensi seluruh kelas dalam satu query; index = id siswa"""
+    df = read_sql(f"""SELECT s.id, s.nama AS Nama,
+            COALESCE(n.rapi, '-') AS Rapi, COALESCE(n.disiplin, '-') AS Disiplin, COALESCE(n.jujur, '-') AS Jujur,
+            COALESCE(n.sakit, 0) AS Sakit, COALESCE(n.izin, 0) AS Izin, COALESCE(n.alpha, 0) AS Alpha
+        FROM siswa s LEFT JOIN non_akademik n ON n.siswa_id = s.id AND {TERM_N}
+        WHERE s.kelas = ? ORDER BY s.nama""", (kelas,))
+    return df.set_index("id")
+
+def _isi(v, default):
+    # Sel kosong di data_editor bisa None / NaN / pd.NA
+    import pandas as pd
+    return default if v is None or pd.isna(v) else v
+
+def simpan_grid_non_akademik(asli, baru):
+    """Tulis hanya baris siswa yang berubah dalam satu transaksi"""
+    kolom = ["Rapi", "Disiplin", "Jujur", "Sakit", "Izin", "Alpha"]
+    ubah = baris_berubah(asli, baru, kolom)
+    rows = [(int(sid), _isi(r.Rapi, "-"), _isi(r.Disiplin, "-"), _isi(r.Jujur, "-"),
+             int(_isi(r.Sakit, 0)), int(_isi(r.Izin, 0)), int(_isi(r.Alpha, 0))) for sid, r in ubah.iterrows()]
+    if rows: write(_tulis_non_akademik, rows)
+    return len(rows)
+
+def _tulis_non_akademik(rows):
+    run_many("""INSERT OR REPLACE INTO non_akademik
+        (siswa_id, rapi, disiplin, jujur, sakit, izin, alpha, tahun_ajar, semester)
+        SELECT ?, ?, ?, ?, ?, ?, ?, tahun_ajar, semester FROM term_aktif""", rows)
+    refresh_rekap(kelas_siswa(r[0] for r in rows), nilai=False)
@@ -0,0 +1,71 @@
+"""Leger (rekap nilai) per kelas / seluruh sekolah dengan pandas."""
+import io
+
+from raport_db import connection, list_mapel, TERM_N
+
+def singkatan_mapel(mapels):
+    """Judul kolom pendek (4 huruf) yang dijamin unik per mapel"""
+    shorts, dipakai = {}, set()
+    for m in mapels:
+        s = m[:4].upper(); i = 2
+        while s in dipakai: s = f"{m[:4].upper()}{i}"; i += 1
+        shorts[m] = s; dipakai.add(s)
+    return shorts
+
+def load_leger(kelas=None):
+    """Nilai term aktif satu kelas (atau seluruh sekolah jika kelas=None) dalam satu query,
+    dipivot menjadi satu baris per siswa dan satu kolom per mapel.
+    Kolom tambahan: Total, Rata (rata-rata mapel terisi) dan Rank (dari tabel peringkat)."""
+    import numpy as np
+    import pandas as pd
+
+    mapels = [m for m, _ in list_mapel()]
+    with connection() as conn:
+        q = f"""SELECT s.id, s.nama, s.kelas, n.mapel, n.nilai FROM siswa s
+               LEFT JOIN nilai n ON n.siswa_id = s.id AND {TERM_N}"""
+        raw = pd.read_sql(q + (" WHERE s.kelas=?" if kelas else ""), conn, params=(kelas,) if kelas else None)
+        rank = dict(conn.execute("SELECT siswa_id, peringkat FROM peringkat" + (" WHERE kelas=?" if kelas else ""),
+                                 (kelas,) if kelas else ()))
+
+    raw = raw[raw["mapel"].isin(mapels) | raw["mapel"].isna()]
+    siswa = raw[["id", "nama", "kelas"]].drop_duplicates("id").set_index("id")
+    nilai = (raw.dropna(subset=["mapel"])
+                .pivot_table(index="id", columns="mapel", values="nilai", aggfunc="first")
+                .reindex(index=siswa.index, columns=mapels).fillna(0).astype(int))
+
+    arr = nilai.to_numpy()
+    terisi = (arr > 0).sum(axis=1)
+    df = siswa.join(nilai)
+    total = arr.sum(axis=1)
+    df["Total"] = total
+    df["Rata"] = np.round(np.divide(total, terisi, out=np.zeros(len(df)), where=terisi > 0), 2)
+    df["Rank"] = pd.Series(rank, dtype="Int64").reindex(df.index)
+    return df.sort_values(["kelas", "nama"]), mapels
+
+def tabel_leger(df, mapels):
+    """Bentuk tampilan leger: No, Nama, singkatan mapel, Total, Rata, Rank"""
+    shorts = singkatan_mapel(mapels)
+    out = df[["nama"] + mapels + ["Total", "Rata", "Rank"]].rename(columns={"nama": "Nama", **shorts})
+    out.insert(0, "No", range(1, len(out) + 1))
+    return out.reset_index(drop=True)
+
+def export_leger_xlsx(kelas=None):
+    """Leger ke XLSX dengan mode constant_memory XlsxWriter (baris ditulis
+    berurutan dan langsung di-flush), satu sheet per kelas."""
+    import xlsxwriter
+
+    df, mapels = load_leger(kelas)
+    bio = io.BytesIO()
+    wb = xlsxwriter.Workbook(bio, {"constant_memory": True})
+    bold = wb.add_format({"bold": True, "bg_color": "#E0F7FA", "border": 1})
+    for k, grup in df.groupby("kelas", sort=True):
+        tabel = tabel_leger(grup, mapels)
+        # Nama sheet Excel maks 31 karakter dan tanpa []:*?/\
+        ws = wb.add_worksheet("".join("_" if ch in "[]:*?/\\" else ch for ch in str(k))[:31])
+        ws.set_column(1, 1, 30)
+        ws.write_row(0, 0, list(tabel.columns), bold)
+        for r, row in enumerate(tabel.itertuples(index=False), start=1):
+            ws.write_row(r, 0, [v.item() if hasattr(v, "item") else v for v in row])
+    wb.close()
+    bio.seek(0)
+    return bio
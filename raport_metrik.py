@@ -0,0 +1,189 @@
+"""Instrumentasi ringan per rerun Streamlit: jumlah & waktu query SQL (per
+statement ternormalisasi), waktu render docx dan waktu per halaman/tab.
+
+Mati secara default (atau nyalakan dengan env RAPORT_METRIK=1); saat mati tiap
+titik ukur hanya memeriksa satu flag. Tanpa dependensi Streamlit."""
+import functools
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+AKTIF = os.environ.get("RAPORT_METRIK", "") not in ("", "0")
+MAKS_RERUN = 2000 # rerun terakhir yang disimpan untuk persentil
+
+_rerun = deque(maxlen=MAKS_RERUN)
+_statement = {} # sql ternormalisasi -> [jumlah, total_detik, maks_detik]
+_lock = threading.Lock()
+_local = threading.local() # rekaman rerun milik thread ini
+
+def aktifkan(nyala=True):
+    global AKTIF
+    AKTIF = bool(nyala)
+
+def reset():
+    with _lock: _rerun.clear(); _statement.clear()
+
+# ==========================================
+# NORMALISASI SQL
+# ==========================================
+_RE_TEKS = re.compile(r"'(?:[^']|'')*'")
+_RE_ANGKA = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_DAFTAR = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_SPASI = re.compile(r"\s+")
+
+@functools.lru_cache(maxsize=1024)
+def normalisasi_sql(sql):
+    """Bentuk statement tanpa literal, mis. 'WHERE id IN (?,?,?)' -> 'WHERE id IN (?…)'"""
+    s = _RE_SPASI.sub(" ", sql).strip()
+    s = _RE_ANGKA.sub("?", _RE_TEKS.sub("?", s))
+    return _RE_DAFTAR.sub("(?…)", s)
+
+# ==========================================
+# REKAMAN PER RERUN
+# ==========================================
+def rekaman_aktif():
+    return getattr(_local, "rek", None)
+
+@contextmanager
+def lanjutkan(rek):
+    """Catat pekerjaan di thread lain (mis. writer thread) ke rekaman `rek`"""
+    lama = rekaman_aktif(); _local.rek = rek
+    try: yield
+    finally: _local.rek = lama
+
+@contextmanager
+def rerun(halaman):
+    """Bungkus satu eksekusi skrip; hasilnya disimpan saat blok selesai
+    (termasuk jika keluar lewat st.rerun()/exception)"""
+    if not AKTIF or rekaman_aktif() is not None:
+        yield; return
+    rek = {"halaman": halaman, "mulai": time.time(), "query": 0, "sql_detik": 0.0,
+           "docx_detik": 0.0, "bagian": {}, "sql": {}}
+    _local.rek = rek; t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _local.rek = None
+        rek["detik"] = time.perf_counter() - t0
+        sql = rek.pop("sql")
+        terlambat = max(sql.items(), key=lambda kv: kv[1][1], default=("", [0, 0.0]))
+        rek["sql_terlambat"], rek["sql_maks"] = terlambat[0], terlambat[1][1]
+        with _lock:
+            _rerun.append(rek)
+            for norm, (n, detik, maks) in sql.items():
+                agg = _statement.setdefault(norm, [0, 0.0, 0.0])
+                agg[0] += n; agg[1] += detik; agg[2] = max(agg[2], maks)
+
+def tandai_halaman(nama):
+    """Ganti nama halaman rerun yang sedang berjalan (mis. setelah menu dipilih)"""
+    rek = rekaman_aktif()
+    if rek is not None: rek["halaman"] = nama
+
+@contextmanager
+def bagian(nama):
+    """Ukur waktu satu bagian halaman (mis. tab)"""
+    rek = rekaman_aktif()
+    if rek is None:
+        yield; return
+    t0 = time.perf_counter()
+    try: yield
+    finally: rek["bagian"][nama] = rek["bagian"].get(nama, 0.0) + time.perf_counter() - t0
+
+def diukur(fn):
+    """Dekorator waktu render dokumen (docx_detik). Jika dipanggil di luar
+    rerun (mis. data download_button dibuat belakangan), dicatat sebagai
+    rekaman tersendiri '⬇ nama_fungsi'. Panggilan bersarang (generate_docx_db
+    di dalam generate_zip_kelas) tidak dihitung dua kali: hanya yang terluar."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not AKTIF or getattr(_local, "docx_dalam", False): return fn(*args, **kwargs)
+        with rerun(f"⬇ {fn.__name__}"):
+            rek = rekaman_aktif(); t0 = time.perf_counter(); _local.docx_dalam = True
+            try: return fn(*args, **kwargs)
+            finally:
+                _local.docx_dalam = False
+                if rek is not None: rek["docx_detik"] += time.perf_counter() - t0
+    return wrapper
+
+def catat_sql(sql, detik, baru=True):
+    rek = rekaman_aktif()
+    if rek is None: return
+    norm = normalisasi_sql(sql)
+    st = rek["sql"].get(norm)
+    if st is None: st = rek["sql"][norm] = [0, 0.0, 0.0]
+    if baru: st[0] += 1; rek["query"] += 1
+    st[1] += detik; st[2] = max(st[2], detik); rek["sql_detik"] += detik
+
+class CursorTerukur(sqlite3.Cursor):
+    """Cursor yang mencatat waktu execute + fetch ke rekaman rerun aktif"""
+    _sql = ""
+    def execute(self, sql, params=()):
+        self._sql = sql; t0 = time.perf_counter()
+        try: return super().execute(sql, params)
+        finally: catat_sql(sql, time.perf_counter() - t0)
+    def executemany(self, sql, rows):
+        self._sql = sql; t0 = time.perf_counter()
+        try: return super().executemany(sql, rows)
+        finally: catat_sql(sql, time.perf_counter() - t0)
+    def _fetch(self, fn, *args):
+        t0 = time.perf_counter()
+        try: return fn(*args)
+        finally: catat_sql(self._sql, time.perf_counter() - t0, baru=False)
+    def fetchone(self): return self._fetch(super().fetchone)
+    def fetchmany(self, size=None): return self._fetch(super().fetchmany, size or self.arraysize)
+    def fetchall(self): return self._fetch(super().fetchall)
+    def __next__(self): return self._fetch(super().__next__)
+
+# ==========================================
+# RINGKASAN (PANEL ADMIN)
+# ==========================================
+def daftar_rerun():
+    """DataFrame rerun yang tersimpan, satu baris per rerun"""
+    import pandas as pd
+    with _lock: data = list(_rerun)
+    kolom = ["mulai", "halaman", "detik", "query", "sql_detik", "docx_detik", "sql_terlambat", "sql_maks"]
+    return pd.DataFrame(data, columns=kolom + ["bagian"])
+
+def persentil_halaman(df):
+    """p50/p90/p99 waktu per halaman + jumlah query dan waktu SQL/docx"""
+    import pandas as pd
+    if df.empty: return pd.DataFrame()
+    g = df.groupby("halaman")
+    out = pd.DataFrame({"Rerun": g.size(),
+                        "p50 ms": g["detik"].quantile(0.5) * 1000, "p90 ms": g["detik"].quantile(0.9) * 1000,
+                        "p99 ms": g["detik"].quantile(0.99) * 1000, "Query p50": g["query"].median(),
+                        "Query maks": g["query"].max(), "SQL p90 ms": g["sql_detik"].quantile(0.9) * 1000,
+                        "Docx p90 ms": g["docx_detik"].quantile(0.9) * 1000})
+    return out.sort_values("p90 ms", ascending=False).round(1)
+
+def persentil_bagian(df):
+    """p50/p90 waktu per bagian (tab) halaman"""
+    import pandas as pd
+    baris = [(h, b, d) for h, bag in zip(df["halaman"], df["bagian"]) for b, d in bag.items()]
+    if not baris: return pd.DataFrame()
+    b = pd.DataFrame(baris, columns=["Halaman", "Bagian", "detik"]).groupby(["Halaman", "Bagian"])["detik"]
+    return (pd.DataFrame({"Jumlah": b.size(), "p50 ms": b.quantile(0.5) * 1000, "p90 ms": b.quantile(0.9) * 1000})
+              .sort_values("p90 ms", ascending=False).round(1).reset_index())
+
+def rerun_terlambat(df, n=20):
+    """n rerun paling lama beserta statement SQL terlambatnya"""
+    import pandas as pd
+    out = df.nlargest(n, "detik").drop(columns="bagian")
+    out["mulai"] = pd.to_datetime(out["mulai"], unit="s")
+    for k in ("detik", "sql_detik", "docx_detik", "sql_maks"): out[k] = (out[k] * 1000).round(1)
+    return out.rename(columns={"mulai": "Waktu", "halaman": "Halaman", "detik": "Total ms", "query": "Query",
+                               "sql_detik": "SQL ms", "docx_detik": "Docx ms", "sql_terlambat": "SQL terlambat",
+                               "sql_maks": "SQL terlambat ms"})
+
+def statement_terburuk(n=20):
+    """Statement dengan total waktu terbesar sejak reset"""
+    import pandas as pd
+    with _lock: data = [(s, *v) for s, v in _statement.items()]
+    df = pd.DataFrame(data, columns=["SQL", "Jumlah", "Total ms", "Maks ms"])
+    df["Total ms"] *= 1000; df["Maks ms"] *= 1000
+    df["Rata ms"] = df["Total ms"] / df["Jumlah"].clip(lower=1)
+    return df.sort_values("Total ms", ascending=False).head(n).round(2).reset_index(drop=True)
@@ -0,0 +1,100 @@
+"""Statistik sekolah: monitoring pengisian nilai dan dashboard analitik."""
+from raport_db import connection, read_sql, TERM_N, SEBARAN
+
+# Satu query agregat untuk seluruh matriks mapel x kelas (nilai term aktif)
+SQL_MONITORING = f"""
+SELECT m.nama AS mapel, k.nama AS kelas, g.guru,
+       COALESCE(t.total, 0) AS total, COALESCE(f.terisi, 0) AS terisi
+FROM master_mapel m CROSS JOIN master_kelas k
+LEFT JOIN (SELECT mapel, kelas, group_concat(guru, ', ') AS guru
+           FROM penugasan GROUP BY mapel, kelas) g ON g.mapel = m.nama AND g.kelas = k.nama
+LEFT JOIN (SELECT kelas, count(*) AS total FROM siswa GROUP BY kelas) t ON t.kelas = k.nama
+LEFT JOIN (SELECT n.mapel, s.kelas, count(*) AS terisi FROM nilai n
+           JOIN siswa s ON s.id = n.siswa_id WHERE n.nilai > 0 AND {TERM_N}
+           GROUP BY n.mapel, s.kelas) f ON f.mapel = m.nama AND f.kelas = k.nama
+"""
+
+def load_monitoring():
+    """DataFrame panjang: mapel, kelas, guru, total siswa, jumlah nilai terisi (>0)"""
+    import pandas as pd
+    with connection() as conn:
+        return pd.read_sql(SQL_MONITORING, conn)
+
+def status_monitoring(row, persen=False):
+    """Teks sel matriks, mis. '✅ Budi 36/36', '⏳ Sari 12/36', '❌ Andi 0/36'"""
+    if not isinstance(row.guru, str) or not row.guru: return "⚠️ Kosong" # NULL -> None/NaN
+    if persen: isi = f"{row.terisi / row.total:.0%}" if row.total else "-"
+    else: isi = f"{row.terisi}/{row.total}"
+    ikon = "✅" if row.total and row.terisi >= row.total else "⏳" if row.terisi else "❌"
+    return f"{ikon} {row.guru} {isi}"
+
+def matriks_monitoring(df, persen=False):
+    """Pivot menjadi matriks: baris mapel, kolom kelas"""
+    import pandas as pd
+    if df.empty: return pd.DataFrame()
+    df = df.assign(status=[status_monitoring(r, persen) for r in df.itertuples(index=False)])
+    return df.pivot(index="mapel", columns="kelas", values="status").rename_axis(index="Mapel", columns=None)
+
+# ==========================================
+# DASHBOARD (DARI TABEL REKAP)
+# ==========================================
+# Dashboard hanya membaca rekap_nilai/rekap_absen (diperbarui saat nilai
+# ditulis, lihat raport_db.refresh_rekap), tidak memindai tabel nilai.
+def load_rekap():
+    """rekap_nilai term aktif + KKM: satu baris per kelas x mapel"""
+    return read_sql("SELECT r.*, m.kkm FROM rekap_nilai r JOIN master_mapel m ON m.nama = r.mapel")
+
+def load_rekap_absen():
+    """rekap_absen term aktif: satu baris per kelas"""
+    return read_sql("SELECT kelas, siswa, terisi, sakit, izin, alpha FROM rekap_absen ORDER BY kelas")
+
+def load_kkm_siswa():
+    """Per kelas: siswa yang sudah punya nilai & yang punya >= 1 mapel di bawah KKM (dari tabel peringkat)"""
+    return read_sql("""SELECT kelas, sum(terisi > 0) AS dinilai, sum(bawah_kkm > 0) AS bawah
+        FROM peringkat WHERE kelas != '' GROUP BY kelas""")
+
+def _bagi(a, b):
+    import numpy as np
+    a, b = np.asarray(a, float), np.asarray(b, float)
+    return np.divide(a, b, out=np.full(len(a), np.nan), where=b > 0)
+
+def ringkas_rekap(df, by=None, kkm_siswa=None):
+    """Gabungkan baris rekap per `by` ('kelas' / 'mapel'; None = seluruh sekolah).
+    Rata & simpangan baku dihitung dari jumlah dan jumlah kuadrat, bukan dari nilai mentah.
+    'Siswa < KKM %' = siswa bernilai yang punya >= 1 nilai di bawah KKM; per kelas /
+    sekolah dari kkm_siswa (load_kkm_siswa), per mapel langsung dari rekap."""
+    import numpy as np
+    import pandas as pd
+    if by: g = df.groupby(by).agg(slot=("siswa", "sum"), terisi=("terisi", "sum"), jumlah=("jumlah", "sum"),
+                                  kuadrat=("jumlah_kuadrat", "sum"), bawah=("bawah_kkm", "sum"),
+                                  minimum=("minimum", "min"), maksimum=("maksimum", "max"))
+    else: g = pd.DataFrame([{"slot": df["siswa"].sum(), "terisi": df["terisi"].sum(), "jumlah": df["jumlah"].sum(),
+                             "kuadrat": df["jumlah_kuadrat"].sum(), "bawah": df["bawah_kkm"].sum(),
+                             "minimum": df["minimum"].min(), "maksimum": df["maksimum"].max()}], index=["Sekolah"])
+    if by == "mapel": dinilai, bawah = g["terisi"], g["bawah"] # satu nilai per siswa per mapel
+    elif kkm_siswa is None: dinilai = bawah = pd.Series(np.nan, index=g.index)
+    else:
+        k = kkm_siswa.set_index("kelas")[["dinilai", "bawah"]]
+        k = k.reindex(g.index).fillna(0) if by else k.sum().to_frame("Sekolah").T
+        dinilai, bawah = k["dinilai"], k["bawah"]
+    rata = _bagi(g["jumlah"], g["terisi"])
+    out = pd.DataFrame({
+        "Terisi": g["terisi"], "Slot": g["slot"], "Kelengkapan %": _bagi(g["terisi"], g["slot"]) * 100,
+        "Rata": rata, "Simpangan Baku": np.sqrt(np.maximum(_bagi(g["kuadrat"], g["terisi"]) - rata ** 2, 0)),
+        "Min": g["minimum"], "Maks": g["maksimum"], "Nilai < KKM": g["bawah"],
+        "Siswa < KKM": bawah, "Siswa < KKM %": _bagi(bawah, dinilai) * 100,
+    }, index=g.index)
+    return out.round(2).rename_axis(by.capitalize() if by else None)
+
+def sebaran_nilai(df, by=None):
+    """Jumlah nilai per rentang SEBARAN, per `by` (None = seluruh sekolah)"""
+    kolom = [f"s{i}" for i in range(len(SEBARAN))]
+    label = {k: nama for k, (nama, _, _) in zip(kolom, SEBARAN)}
+    out = df.groupby(by)[kolom].sum() if by else df[kolom].sum().to_frame("Sekolah").T
+    return out.rename(columns=label)
+
+def ringkas_absen(df):
+    """Rekap absensi per kelas + rata-rata per siswa"""
+    out = df.set_index("kelas").rename_axis("Kelas")
+    for k in ("sakit", "izin", "alpha"): out[f"{k} / siswa"] = _bagi(out[k], out["siswa"]).round(2)
+    return out.rename(columns=str.capitalize)
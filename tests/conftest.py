@@ -0,0 +1,23 @@
+"""Fixture bersama: DB sekolah sintetis kecil di folder sementara (lihat raport_bench.buat_sekolah)."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import raport_cache
+import raport_db
+import raport_bench
+
+@pytest.fixture
+def sekolah(tmp_path, monkeypatch):
+    """Fungsi pembuat DB: sekolah(siswa=.., kelas=.., mapel=..) -> path. Cache dokumen mati."""
+    monkeypatch.setattr(raport_db, "DB_NAME", raport_db.DB_NAME)
+    monkeypatch.setattr(raport_cache, "CACHE_DIR", None)
+    def buat(siswa=40, kelas=2, mapel=5, **kw):
+        path = str(tmp_path / f"sekolah_{siswa}_{kelas}_{mapel}.db")
+        raport_bench.buat_sekolah(path, siswa, kelas, mapel, **kw)
+        return path
+    yield buat
+    raport_db.bump_data_version()
@@ -0,0 +1,16 @@
+"""Cache dokumen hanya pelengkap: folder yang tidak bisa ditulis tidak boleh menggagalkan raport."""
+import raport_cache
+from raport_db import list_kelas, load_kelas_snapshot
+from raport_docx import generate_docx_db, generate_zip_kelas
+
+def test_cache_tidak_bisa_ditulis(sekolah, tmp_path, monkeypatch):
+    sekolah(siswa=6, kelas=1, mapel=2)
+    bukan_folder = tmp_path / "cache"; bukan_folder.write_text("file biasa, bukan folder")
+    monkeypatch.setattr(raport_cache, "CACHE_DIR", str(bukan_folder))
+    monkeypatch.setattr(raport_cache, "_ukuran", None)
+    gagal = raport_cache.statistik["gagal"]
+
+    snap = load_kelas_snapshot(list_kelas()[0][0]); sid = snap["siswa"][0][0]
+    assert generate_docx_db(sid, snap).getvalue()[:2] == b"PK"
+    assert generate_zip_kelas(snap).getvalue()[:2] == b"PK"
+    assert raport_cache.statistik["gagal"] > gagal
@@ -0,0 +1,28 @@
+"""Mesin template harus menghasilkan .docx yang identik dengan python-docx."""
+import raport_docx
+from raport_db import transaction, refresh_peringkat, update_config, list_kelas, load_kelas_snapshot
+from raport_docx import beda_mesin, bagian_beda, render_template, render_docx
+
+NAMA_SULIT = ['A & B <c> "d" \'e\'', "  Spasi Depan", "Belakang  ", "Tab\tdi Tengah", "Baris\nBaru\r\nLagi",
+              "Ünïcödé Ñamé 😀", "Kurung ]]> & &amp;"]
+
+def test_template_sama_dengan_python_docx(sekolah):
+    sekolah(siswa=30, kelas=2, mapel=4)
+    kelas = [k for k, _ in list_kelas()]
+    with transaction() as conn:
+        conn.executemany("UPDATE siswa SET nama=?, nisn=? WHERE id=?",
+                         [(nm, f" {i}\t<{i}>", i + 1) for i, nm in enumerate(NAMA_SULIT)])
+        conn.execute("INSERT INTO master_mapel (nama, kkm) VALUES ('Seni & Budaya <Lokal>', 75)")
+        conn.execute("UPDATE master_kelas SET wali_kelas='Dra. Siti \"Nur\" & Co'")
+        update_config("alamat", "Jl. Merdeka No. 1 & 2\tRT <03>"); update_config("kepsek", " Ñoño ")
+    refresh_peringkat(kelas)
+
+    raport_docx._kerangka.clear()
+    for k in kelas: assert beda_mesin(load_kelas_snapshot(k)) == []
+    assert raport_docx._kerangka and None not in raport_docx._kerangka.values() # bukan fallback python-docx
+
+def test_deteksi_beda(sekolah):
+    sekolah(siswa=4, kelas=1, mapel=2)
+    snap = load_kelas_snapshot(list_kelas()[0][0]); sid = snap["siswa"][0][0]
+    lain = load_kelas_snapshot(list_kelas()[0][0]) | {"wali": "Wali Lain"}
+    assert bagian_beda(render_template(sid, snap).getvalue(), render_docx(sid, lain).getvalue()) == ["word/document.xml"]
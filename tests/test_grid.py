@@ -0,0 +1,20 @@
+"""Simpan grid nilai: hanya sel berubah yang ditulis, sel dikosongkan = nilai dihapus."""
+import pandas as pd
+
+from raport_db import list_kelas, list_mapel, load_peringkat, load_kelas_snapshot
+from raport_import import grid_nilai, simpan_grid_nilai
+
+def test_grid_ubah_dan_kosongkan(sekolah):
+    sekolah(siswa=5, kelas=1, mapel=2)
+    k, m = list_kelas()[0][0], list_mapel()[0][0]
+    asli = grid_nilai(k, m); baru = asli.copy()
+    a, b, c = asli.index[:3]
+    baru.loc[a, "Nilai"] = 100 if asli.at[a, "Nilai"] != 100 else 99
+    baru.loc[[b, c], "Nilai"] = pd.NA
+
+    assert simpan_grid_nilai(asli, baru, m, k) == (1, 2)
+    hasil = grid_nilai(k, m)["Nilai"]
+    assert hasil[a] == baru.at[a, "Nilai"] and hasil[[b, c]].isna().all()
+    assert m not in load_kelas_snapshot(k)["nilai"][b]
+    assert simpan_grid_nilai(hasil.to_frame(), hasil.to_frame(), m, k) == (0, 0) # tidak ada perubahan
+    assert len(load_peringkat(k)) == 5
@@ -0,0 +1,43 @@
+"""Jumlah query export raport satu kelas harus tetap, tidak bergantung jumlah siswa."""
+import raport_db
+from raport_db import transaction, refresh_peringkat, list_kelas, list_mapel, get_config, load_kelas_snapshot
+from raport_docx import generate_zip_kelas
+
+MAKS_QUERY = 6
+
+def _hitung_query(fn):
+    sql = []
+    with raport_db.connection() as conn: # blok bersarang memakai koneksi yang sama
+        conn.set_trace_callback(sql.append)
+        try: fn()
+        finally: conn.set_trace_callback(None)
+    return sql
+
+def _export(kelas):
+    snap = load_kelas_snapshot(kelas)
+    generate_zip_kelas(snap)
+    return snap
+
+def test_query_export_kelas_tetap(sekolah):
+    sekolah(siswa=45, kelas=2, mapel=5)
+    k1, k2 = [k for k, _ in list_kelas()]
+    with transaction() as conn: # kelas 1 ~3x lebih besar dari kelas 2
+        conn.execute("UPDATE siswa SET kelas=? WHERE kelas=? AND id % 2 = 0", (k1, k2))
+    refresh_peringkat([k1, k2])
+
+    hasil = {}
+    for k in (k1, k2):
+        get_config(); list_mapel() # config & mapel sudah di cache (seperti di app)
+        snap = []
+        sql = _hitung_query(lambda: snap.append(_export(k)))
+        hasil[k] = (len(snap[0]["siswa"]), len(sql))
+    (n1, q1), (n2, q2) = hasil[k1], hasil[k2]
+    assert n1 >= 2 * n2
+    assert 0 < q1 == q2 <= MAKS_QUERY, hasil
+
+    # Cache dingin: config & mapel ikut dibaca, tetap konstan
+    dingin = []
+    for k in (k1, k2):
+        raport_db.bump_data_version()
+        dingin.append(len(_hitung_query(lambda: _export(k))))
+    assert dingin[0] == dingin[1] > q1, dingin
@@ -0,0 +1,13 @@
+"""Simpanan bersamaan lewat writer thread: tidak ada yang gagal, tidak ada yang hilang."""
+import raport_bench
+from raport_db import list_kelas, list_mapel, load_peringkat
+
+PENYIMPAN = 50
+
+def test_50_penyimpan_bersamaan(sekolah):
+    sekolah(siswa=100, kelas=10, mapel=5, terisi=0.5)
+    kelas = [k for k, _ in list_kelas()]; mapel = [m for m, _ in list_mapel()]
+    for geser in (1, 2): # putaran kedua menimpa nilai putaran pertama
+        tersimpan, dikirim = raport_bench._simpan_bersamaan(kelas, mapel, PENYIMPAN, geser)
+        assert tersimpan == dikirim == 500
+    assert len(load_peringkat()) == 100 # peringkat tiap kelas ikut diperbarui